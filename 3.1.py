@@ -1,14 +1,24 @@
-from PyQt5.QtWidgets import QMainWindow, QLabel, QFileDialog, QAction, QToolBar, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QColorDialog, QSlider, QScrollArea, QGridLayout, QSizePolicy, QInputDialog, QDialog, QListWidget, QVBoxLayout, QPushButton, QLabel, QListWidgetItem, QTreeWidget, QTreeWidgetItem, QApplication, QLineEdit
-from PyQt5.QtGui import QPixmap, QPainter, QColor, QImage, QIcon, QFont, QIntValidator
-from PyQt5.QtCore import Qt, QPoint, QRectF, QSize, QTimer
+from PyQt5.QtWidgets import QMainWindow, QLabel, QFileDialog, QAction, QToolBar, QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QColorDialog, QSlider, QScrollArea, QGridLayout, QSizePolicy, QInputDialog, QMessageBox, QDialog, QListWidget, QVBoxLayout, QPushButton, QLabel, QListWidgetItem, QTreeView, QApplication, QLineEdit
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QBrush, QImage, QPolygon, QIcon, QFont, QFontMetrics, QStaticText, QTransform, QIntValidator
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex, QObject, QPoint, QRect, QRectF, QSize, QTimer, QBuffer, QIODevice, QLockFile, pyqtSignal
 
-from collections import deque
+from collections import OrderedDict, deque
+import concurrent.futures
 import json
 import os
 import math
-import urllib.request
+import random
+import http.client
 import urllib.parse
+import zipfile
 import base64
+import hashlib
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
 from io import BytesIO
 
 # color palette
@@ -77,25 +87,40 @@ class CollisionPaletteWidget(QWidget):
         for idx, btn in enumerate(self.buttons):
             btn.setStyleSheet(f"background: {self.colors[idx].name()}; border: 2px solid {'#333' if self.colors[idx] == self.get_active_color_callback() else '#ccc'};")
 
+# the map view, paints straight onto the screen whenever qt asks instead of going through a pixmap
+class MapCanvas(QWidget):
+    def __init__(self, draw_callback, parent=None):
+        super().__init__(parent)
+        self.draw_callback = draw_callback
+
+    def paintEvent(self, event):
+        # qt merges every update(rect) since the last paint into this one rect
+        painter = QPainter(self)
+        self.draw_callback(painter, event.rect())
+        painter.end()
+
 # canvas
 class EditorWindow(QMainWindow):
-    def __init__(self):
+    log_posted = pyqtSignal(str)
+    asset_categories_listed = pyqtSignal(str, list)
+    asset_category_loaded = pyqtSignal(str, str, list)
+    asset_library_loaded = pyqtSignal(str)
+    assets_changed = pyqtSignal(str)
+
+    def __init__(self, asset_source_spec=None):
         super().__init__()
         self.setWindowTitle("Father Map Editor 3.0")
         self.resize(1200, 800)
 
         # area
-        self.image_label = QLabel()
-        self.image_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        self.image_label.setMinimumSize(400, 400)
-        self.image_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
-        self.pixmap = QPixmap(2048, 2048) # default size, i'll add an option to make it bigger later
-        self.pixmap.fill(Qt.white)
-        self.image_label.setPixmap(self.pixmap)
+        self.canvas_widget = MapCanvas(self._draw_canvas)
+        self.canvas_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.canvas_widget.setMinimumSize(400, 400)
+        self.canvas_widget.setMouseTracking(True) # previews follow the pointer without a button held
+        self.pixmap = ChunkedLayer(2048, 2048, Qt.white) # default size, i'll add an option to make it bigger later
 
         # collision layer
-        self.collision_layer = QPixmap(self.pixmap.size())
-        self.collision_layer.fill(QColor(255,255,255,0))  # transparent
+        self.collision_layer = ChunkedLayer(self.pixmap.width(), self.pixmap.height(), QColor(255,255,255,0))  # transparent
         self.collision_mode = False
         self.collision_color = QColor(255,0,0)
         self.collision_palette = [QColor(255,0,0)]
@@ -105,24 +130,21 @@ class EditorWindow(QMainWindow):
         self.zoom = 1.0
         self.offset = [0.0, 0.0]
         self.last_pan_point = None
-        self.drawing = False
+        self.stroke = None  # StrokeSession while the brush is held down
         self.brush_size = 1
         self.active_color = QColor(0, 0, 0)
         self.eraser_mode = False
         self.palette_colors = [QColor(0,0,0), QColor(255,255,255)] # add more colors later
 
         # undo and redo
-        self.undo_stack = deque(maxlen=50)
-        self.redo_stack = deque(maxlen=50)
+        self.undo_stack = UndoHistory(UNDO_MEMORY_BYTES, UNDO_DISK_BYTES, UNDO_HOT_ENTRIES, self._undo_layer_bytes)
+        self.redo_stack = UndoHistory(UNDO_MEMORY_BYTES, UNDO_DISK_BYTES, UNDO_HOT_ENTRIES, self._undo_layer_bytes)
 
         # stamps
         self.stamp_folder = "stamps"
         self.stamps = {}
         self.active_stamp = None
         self.stamp_preview_pos = None
-        self.stamp_preview_timer = QTimer()
-        self.stamp_preview_timer.timeout.connect(self._update_stamp_preview)
-        self.stamp_preview_timer.setInterval(16)  # 60Hz, make this flexivle later
 
         # prefabs
         self.prefab_folder = "prefabs"
@@ -130,9 +152,6 @@ class EditorWindow(QMainWindow):
         self.active_prefab = None
         self.prefab_preview_pos = None
         self.prefab_objects = []
-        self.prefab_preview_timer = QTimer()
-        self.prefab_preview_timer.timeout.connect(self._update_prefab_preview)
-        self.prefab_preview_timer.setInterval(16)
 
         # npcs
         self.npc_folder = "npcs"
@@ -140,9 +159,6 @@ class EditorWindow(QMainWindow):
         self.active_npc = None
         self.npc_preview_pos = None
         self.npc_objects = []
-        self.npc_preview_timer = QTimer()
-        self.npc_preview_timer.timeout.connect(self._update_npc_preview)
-        self.npc_preview_timer.setInterval(16)
 
         # triggers
         self.trigger_mode = False
@@ -154,36 +170,87 @@ class EditorWindow(QMainWindow):
         # enemy spawn areas
         self.spawn_mode = False
         self.spawn_areas = []
+
+        # so the canvas only looks at objects near the viewport, keep in sync with the lists above
+        sprite_bounds = lambda obj: (obj["x"], obj["y"], obj["x"] + obj["image"].width(), obj["y"] + obj["image"].height())
+        self.object_indexes = {
+            "prefab_objects": SpatialIndex(OBJECT_INDEX_CELL_SIZE, sprite_bounds),
+            "npc_objects": SpatialIndex(OBJECT_INDEX_CELL_SIZE, sprite_bounds),
+            "trigger_rectangles": SpatialIndex(OBJECT_INDEX_CELL_SIZE, lambda trigger: trigger["start"] + trigger["end"]),
+            "spawn_areas": SpatialIndex(OBJECT_INDEX_CELL_SIZE, lambda spawn: (spawn["x"], spawn["y"], spawn["x"] + SPAWN_CHUNK_SIZE, spawn["y"] + SPAWN_CHUNK_SIZE)),
+        }
         self.active_spawn_edit = None
+        self.collision_view = None  # cached collision mode blend of the layers, see _collision_view
+        # trigger/spawn labels, laid out once per label text instead of every frame
+        self.label_fonts = {"spawn": QFont("Arial", 8), "trigger": QFont("Arial", 10)}
+        self.label_ascents = {kind: QFontMetrics(font).ascent() for kind, font in self.label_fonts.items()}
+        self.label_texts = {}  # (kind, text) -> QStaticText
 
         # grid
         self.show_grid = False
-        self.grid_size = 32
+        self.grid_size = SPAWN_CHUNK_SIZE  # one cell per game chunk
+        self.grid_pattern = None  # (zoom and view size, pattern) from _grid_pattern, panning reuses it
 
         # toolbar
         self._create_toolbar()
         self.trigger_btn.hide()
         self.spawn_btn.hide()
 
-        # other stuff
-        self._create_palettes()
-        self._create_layout()
-        self._load_stamps()
-        self._load_prefabs()
-        self._load_npcs()
-        self._setup_refresh_rate()
-        self.image_label.installEventFilter(self)
-        self.enemy_list = ["jimmy"] # this is a placeholder in case the team forgets to add enemies
-
         # tiles (what makes this editor different from ms paint)
         self.tile_stamp_folder = "tiles"
         self.tiles = {}
         self.active_tile_stamp = None
         self.tile_stamp_preview_pos = None
-        self._load_tiles()
         self.tile_drawing = False
         self.last_tile_stamp_pos = None
 
+        # downloaded asset cache, the pool that fills it and where the assets come from
+        self.asset_cache = AssetCache(ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES)
+        self.asset_fetcher = AssetFetcher(ASSET_FETCH_WORKERS, ASSET_FETCH_PER_HOST)
+        self.image_cache = ImageCache(ASSET_IMAGE_CACHE_BYTES, IMAGE_DECODE_WORKERS)
+        # previews and placed objects draw a placeholder until the decode lands
+        self.image_cache.image_ready.connect(self._on_image_ready)
+        self.loading_objects = []  # placed prefabs/NPCs still showing the placeholder
+        self.thumbnails = ThumbnailStore(os.path.join(ASSET_CACHE_DIR, "thumbs"), THUMBNAIL_SIZE, THUMBNAIL_WORKERS)
+        self.asset_models = {
+            root: AssetBrowserModel(getattr(self, root), self.thumbnails, title)
+            for root, title in ASSET_BROWSER_TITLES.items()
+        }
+        self.stale_asset_models = set()
+        self.tile_selector = None  # made the first time the tile editor opens, then just hidden
+
+        # other stuff
+        self._create_palettes()
+        self._create_layout()
+        # after the layout so a source that won't open can say so in the log bar
+        self.asset_source = make_asset_source(asset_source_spec or ASSET_SOURCE, self.asset_cache, self.asset_fetcher, self.log, self._handle_network_error)
+        self.asset_categories_listed.connect(self._on_asset_categories_listed)
+        self.asset_category_loaded.connect(self._on_asset_category_loaded)
+        self.asset_library_loaded.connect(self._on_asset_library_loaded)
+        self.assets_changed.connect(self._on_assets_changed)
+        self._load_asset_libraries(["stamps", "prefabs", "npcs", "tiles"])
+        self.canvas_widget.installEventFilter(self)
+        self.enemy_list = ["jimmy"] # this is a placeholder in case the team forgets to add enemies
+
+        # crash recovery, every editor journals to its own file and holds its lock until closeEvent,
+        # so a journal whose lock we can take belongs to a session that died
+        try:
+            os.makedirs(JOURNAL_DIR, exist_ok=True)
+        except OSError:
+            pass
+        self.orphaned_journals = self._claim_orphaned_journals()
+        journal_path = os.path.join(JOURNAL_DIR, f"session-{os.getpid()}-{int(time.time() * 1000)}.journal")
+        self.journal_lock = QLockFile(journal_path + ".lock")
+        self.journal_lock.setStaleLockTime(0)
+        self.journal_lock.tryLock(0)
+        self.journal = EditJournal(journal_path)
+        self._checkpoint_journal(startup=True)
+        self.journal_timer = QTimer(self)
+        self.journal_timer.timeout.connect(self._flush_journal)
+        self.journal_timer.start(JOURNAL_FLUSH_MS)
+        if self.orphaned_journals:
+            QTimer.singleShot(0, self._offer_journal_recovery)
+
 # i lied, here's the actually toolbar
     def _create_toolbar(self):
         toolbar = QToolBar()
@@ -303,9 +370,10 @@ class EditorWindow(QMainWindow):
         self.log_label.setStyleSheet("color: #333; background: #eee; padding: 2px;")
         self.log_label.setFixedHeight(22)
         self.log_label.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
+        self.log_posted.connect(self.log_label.setText)
 
         img_layout = QVBoxLayout()
-        img_layout.addWidget(self.image_label)
+        img_layout.addWidget(self.canvas_widget)
         img_layout.addWidget(self.log_label)
 
         img_widget = QWidget()
@@ -351,28 +419,49 @@ class EditorWindow(QMainWindow):
         
         self.update_canvas()
 # my least favorite part of programming
-    def update_canvas(self):
+    def update_canvas(self, dirty=None):
+        """Schedule a redraw of the view, or only the part of it showing dirty (a map rect) if that's all that changed"""
         if not self.pixmap:
             return
-            
-        canvas = QPixmap(self.image_label.size())
-        canvas.fill(QColor(0, 0, 0, 0))
-        painter = QPainter(canvas)
         
+        if dirty is None:
+            self.canvas_widget.update()
+        else:
+            self.canvas_widget.update(self._map_rect_to_widget(dirty))
+        
+        if self.collision_mode:
+            self.collision_palette_widget.set_active_highlight()
+        else:
+            self.palette_widget.set_active_highlight()
+
+    def _draw_canvas(self, painter, clip):
+        """Paint the part of the view inside clip (widget pixels), called from the canvas widget's paintEvent"""
+        if not self.pixmap:
+            return
+        painter.setClipRect(clip)
+        
+        # always the whole view so a partial redraw scales exactly like a full one, the clip does the limiting
         source_rect = QRectF(self.offset[0], self.offset[1], 
-                            self.image_label.width() / self.zoom, 
-                            self.image_label.height() / self.zoom)
-        target_rect = QRectF(0, 0, self.image_label.width(), self.image_label.height())
+                            self.canvas_widget.width() / self.zoom, 
+                            self.canvas_widget.height() / self.zoom)
+        target_rect = QRectF(0, 0, self.canvas_widget.width(), self.canvas_widget.height())
         
         if self.collision_mode:
-            painter.setOpacity(0.3)
-            painter.drawPixmap(target_rect, self.pixmap, source_rect)
-            painter.setOpacity(1.0)
-            painter.drawPixmap(target_rect, self.collision_layer, source_rect)
+            # faded map, collision and faded prefabs all come blended already
+            self._collision_view().render(painter, target_rect, source_rect)
         else:
-            painter.drawPixmap(target_rect, self.pixmap, source_rect)
+            self.pixmap.render(painter, target_rect, source_rect)
+
+        # labels are unreadable when zoomed far out, so they're left off and the boxes are all that's drawn
+        show_labels = self.zoom >= LABEL_MIN_ZOOM
+        # slack so trigger/spawn labels sticking out past a tiny rect still get drawn (about 6 characters)
+        margin = (96 if show_labels else 2) / self.zoom
+        view = (
+            self.offset[0] + clip.left() / self.zoom - margin, self.offset[1] + clip.top() / self.zoom - margin,
+            self.offset[0] + (clip.right() + 1) / self.zoom + margin, self.offset[1] + (clip.bottom() + 1) / self.zoom + margin
+        )
 
-        for prefab_obj in self.prefab_objects:
+        for _, prefab_obj in ([] if self.collision_mode else self._visible_objects("prefab_objects", view)):
             img = prefab_obj["image"]
             px = prefab_obj["x"]
             py = prefab_obj["y"]
@@ -380,23 +469,13 @@ class EditorWindow(QMainWindow):
             widget_x = (px - self.offset[0]) * self.zoom
             widget_y = (py - self.offset[1]) * self.zoom
             
+            # let the painter scale into the target rect instead of making a scaled copy every frame
             scaled_width = int(img.width() * self.zoom)
             scaled_height = int(img.height() * self.zoom)
-            scaled_img = img.scaled(
-                scaled_width,
-                scaled_height,
-                Qt.IgnoreAspectRatio,
-                Qt.FastTransformation
-            )
             
-            if self.collision_mode:
-                painter.setOpacity(0.3)
-                painter.drawPixmap(int(widget_x), int(widget_y), scaled_img)
-                painter.setOpacity(1.0)
-            else:
-                painter.drawPixmap(int(widget_x), int(widget_y), scaled_img)
+            painter.drawPixmap(int(widget_x), int(widget_y), scaled_width, scaled_height, img)
 
-        for npc_obj in self.npc_objects:
+        for _, npc_obj in self._visible_objects("npc_objects", view):
             img = npc_obj["image"]
             px = npc_obj["x"]
             py = npc_obj["y"]
@@ -406,38 +485,31 @@ class EditorWindow(QMainWindow):
             
             scaled_width = int(img.width() * self.zoom)
             scaled_height = int(img.height() * self.zoom)
-            scaled_img = img.scaled(
-                scaled_width,
-                scaled_height,
-                Qt.IgnoreAspectRatio,
-                Qt.FastTransformation
-            )
             
-            painter.drawPixmap(int(widget_x), int(widget_y), scaled_img)
+            painter.drawPixmap(int(widget_x), int(widget_y), scaled_width, scaled_height, img)
 
         if self.collision_mode:
-            for i, spawn_area in enumerate(self.spawn_areas):
+            painter.setFont(self.label_fonts["spawn"])
+            for i, spawn_area in self._visible_objects("spawn_areas", view):
                 spawn_x = spawn_area["x"]
                 spawn_y = spawn_area["y"]
                 
                 widget_x = (spawn_x - self.offset[0]) * self.zoom
                 widget_y = (spawn_y - self.offset[1]) * self.zoom
                 
-                size = int(32 * self.zoom)
+                size = int(SPAWN_CHUNK_SIZE * self.zoom)
                 
                 painter.setBrush(QColor(0, 0, 255, 80))
                 painter.setPen(QColor(0, 0, 255, 150))
                 painter.drawRect(int(widget_x), int(widget_y), size, size)
                 
-                painter.setPen(QColor(255, 255, 255))
-                painter.setFont(QFont("Arial", 8))
-                painter.drawText(
-                    int(widget_x + 2), int(widget_y + 12),
-                    f"S{i+1}"
-                )
+                if show_labels:
+                    painter.setPen(QColor(255, 255, 255))
+                    self._draw_label(painter, "spawn", int(widget_x + 2), int(widget_y + 12), f"S{i+1}")
 
         if self.collision_mode:
-            for i, trigger in enumerate(self.trigger_rectangles):
+            painter.setFont(self.label_fonts["trigger"])
+            for i, trigger in self._visible_objects("trigger_rectangles", view):
                 start_x, start_y = trigger["start"]
                 end_x, end_y = trigger["end"]
                 
@@ -453,12 +525,9 @@ class EditorWindow(QMainWindow):
                     int(widget_end_x - widget_start_x), int(widget_end_y - widget_start_y)
                 )
                 
-                painter.setPen(QColor(255, 255, 255))
-                painter.setFont(QFont("Arial", 10))
-                painter.drawText(
-                    int(widget_start_x + 5), int(widget_start_y + 15),
-                    f"T{i+1}"
-                )
+                if show_labels:
+                    painter.setPen(QColor(255, 255, 255))
+                    self._draw_label(painter, "trigger", int(widget_start_x + 5), int(widget_start_y + 15), f"T{i+1}")
 
         if self.trigger_mode and self.trigger_start_pos and self.trigger_end_pos:
             if hasattr(self.trigger_start_pos, 'x'):
@@ -496,15 +565,13 @@ class EditorWindow(QMainWindow):
             px = (img_x - preview_img.width() // 2 - self.offset[0]) * self.zoom
             py = (img_y - preview_img.height() // 2 - self.offset[1]) * self.zoom
             
-            scaled_preview = preview_img.scaled(
+            painter.setOpacity(0.7)
+            painter.drawPixmap(
+                int(px), int(py),
                 int(preview_img.width() * self.zoom),
                 int(preview_img.height() * self.zoom),
-                Qt.KeepAspectRatio,
-                Qt.FastTransformation
+                preview_img
             )
-            
-            painter.setOpacity(0.7)
-            painter.drawPixmap(int(px), int(py), scaled_preview)
             painter.setOpacity(1.0)
 
         if self.active_prefab and self.prefab_preview_pos:
@@ -518,15 +585,9 @@ class EditorWindow(QMainWindow):
             
             scaled_width = int(preview_img.width() * self.zoom)
             scaled_height = int(preview_img.height() * self.zoom)
-            scaled_preview = preview_img.scaled(
-                scaled_width,
-                scaled_height,
-                Qt.IgnoreAspectRatio,
-                Qt.FastTransformation
-            )
             
             painter.setOpacity(0.7)
-            painter.drawPixmap(int(px), int(py), scaled_preview)
+            painter.drawPixmap(int(px), int(py), scaled_width, scaled_height, preview_img)
             painter.setOpacity(1.0)
 
         if self.active_npc and self.npc_preview_pos:
@@ -540,15 +601,9 @@ class EditorWindow(QMainWindow):
             
             scaled_width = int(preview_img.width() * self.zoom)
             scaled_height = int(preview_img.height() * self.zoom)
-            scaled_npc_preview = preview_img.scaled(
-                scaled_width,
-                scaled_height,
-                Qt.IgnoreAspectRatio,
-                Qt.FastTransformation
-            )
             
             painter.setOpacity(0.7)
-            painter.drawPixmap(int(px), int(py), scaled_npc_preview)
+            painter.drawPixmap(int(px), int(py), scaled_width, scaled_height, preview_img)
             painter.setOpacity(1.0)
 # this is getting annoying :pensive:
         if self.active_tile_stamp and self.tile_stamp_preview_pos:
@@ -564,32 +619,73 @@ class EditorWindow(QMainWindow):
             painter.setOpacity(1.0)
 
         if self.show_grid:
-            painter.setPen(QColor(255, 0, 0, 100))
-            painter.setOpacity(0.5)
-
-            grid_spacing = self.grid_size * self.zoom
-            start_x = (-self.offset[0] * self.zoom) % grid_spacing
-            start_y = (-self.offset[1] * self.zoom) % grid_spacing
-
-            x = start_x
-            while x < self.image_label.width():
-                painter.drawLine(int(round(x)), 0, int(round(x)), self.image_label.height())
-                x += grid_spacing
-
-            y = start_y
-            while y < self.image_label.height():
-                painter.drawLine(0, int(round(y)), self.image_label.width(), int(round(y)))
-                y += grid_spacing
-
-            painter.setOpacity(1.0)
-
+            columns, rows, color, period = self._grid_pattern()
+            # the pattern starts on the last drawn line left of and above the view, panning only moves that origin
+            origin_x = int(round((math.floor(self.offset[0] / period) * period - self.offset[0]) * self.zoom))
+            origin_y = int(round((math.floor(self.offset[1] / period) * period - self.offset[1]) * self.zoom))
+            # the vertical lines are one tiled texture, a single fill beats hundreds of one pixel wide columns
+            painter.setBrushOrigin(origin_x, 0)
+            painter.fillRect(0, 0, self.canvas_widget.width(), self.canvas_widget.height(), columns)
+            painter.setBrushOrigin(0, 0)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(color)
+            painter.translate(0, origin_y)
+            painter.drawRects(rows)
+            painter.translate(0, -origin_y)
+            painter.setBrush(Qt.NoBrush)
+
+    def _draw_label(self, painter, kind, x, baseline, text):
+        """Same as drawText(x, baseline, text) in the kind's label font (already set on the painter), from a cached QStaticText"""
+        static_text = self.label_texts.get((kind, text))
+        if static_text is None:
+            static_text = self.label_texts[(kind, text)] = QStaticText(text)
+            static_text.prepare(QTransform(), self.label_fonts[kind])
+        # static text is placed by its top left, drawText by the baseline
+        painter.drawStaticText(x, baseline - self.label_ascents[kind], static_text)
+
+    def _grid_pattern(self):
+        """(vertical line brush, row rects, line color, map pixels between lines) for the grid, kept until the view zooms or resizes"""
+        width = self.canvas_widget.width()
+        height = self.canvas_widget.height()
+        # every line is a game chunk edge, zoomed far out they'd be a red haze so only every step-th one
+        # is drawn, fainter so it doesn't read as a chunk; powers of two keep the thinned lines evenly spread
+        step = 1
+        while self.grid_size * step * self.zoom < GRID_MIN_SPACING:
+            step *= 2
+        key = (self.zoom, self.grid_size, step, width, height)
+        if self.grid_pattern is not None and self.grid_pattern[0] == key:
+            return self.grid_pattern[1]
+        color = GRID_CHUNK_COLOR if step == 1 else GRID_FAR_COLOR
+        period = self.grid_size * step
+        # drawing shifts the pattern up to one period left/up, so it runs that much past the view
+        extra = int(math.ceil(period * self.zoom)) + 1
+        
+        # a strip of the vertical lines a few rows tall, the brush repeats it down the view
+        tile = QImage(width + extra, GRID_PATTERN_ROWS, QImage.Format_ARGB32_Premultiplied)
+        tile.fill(Qt.transparent)
+        painter = QPainter(tile)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        i = 0
+        while True:
+            x = int(round(i * period * self.zoom))
+            if x >= width + extra:
+                break
+            painter.fillRect(x, 0, 1, GRID_PATTERN_ROWS, color)
+            i += 1
         painter.end()
-        self.image_label.setPixmap(canvas)
         
-        if self.collision_mode:
-            self.collision_palette_widget.set_active_highlight()
-        else:
-            self.palette_widget.set_active_highlight()
+        rows = []
+        i = 0
+        while True:
+            y = int(round(i * period * self.zoom))
+            if y >= height + extra:
+                break
+            rows.append(QRect(0, y, width, 1))
+            i += 1
+        
+        pattern = (QBrush(tile), rows, color, period)
+        self.grid_pattern = (key, pattern)
+        return pattern
 
     def set_brush_size(self, size):
         self.brush_size = max(1, size)
@@ -629,7 +725,8 @@ class EditorWindow(QMainWindow):
         return self.collision_color
 
     def log(self, msg):
-        self.log_label.setText(f"Latest log: {msg}")
+        # goes through a signal so the fetch pool threads can log too
+        self.log_posted.emit(f"Latest log: {msg}")
 
     def open_resize_dialog(self):
         dlg = QDialog(self)
@@ -684,21 +781,9 @@ class EditorWindow(QMainWindow):
 
         self._push_undo_action('resize')
 
-        old_pixmap = self.pixmap
-        new_pixmap = QPixmap(new_width, new_height)
-        new_pixmap.fill(Qt.white)
-        painter = QPainter(new_pixmap)
-        painter.drawPixmap(0, 0, old_pixmap)
-        painter.end()
-        self.pixmap = new_pixmap
-
-        old_collision = self.collision_layer
-        new_collision = QPixmap(new_width, new_height)
-        new_collision.fill(QColor(255, 255, 255, 0))
-        painter = QPainter(new_collision)
-        painter.drawPixmap(0, 0, old_collision)
-        painter.end()
-        self.collision_layer = new_collision
+        # chunks that still fit are shared with the old layers, only the edge ones get redrawn
+        self.pixmap = self.pixmap.resized(new_width, new_height)
+        self.collision_layer = self.collision_layer.resized(new_width, new_height)
 
         self.offset[0] = max(0, min(self.offset[0], max(0, self.pixmap.width() - 1)))
         self.offset[1] = max(0, min(self.offset[1], max(0, self.pixmap.height() - 1)))
@@ -709,9 +794,8 @@ class EditorWindow(QMainWindow):
     def open_image(self):
         path, _ = QFileDialog.getOpenFileName(self, "Open Map Image", "", "Images (*.png)")
         if path:
-            self.pixmap = QPixmap(path)
-            self.collision_layer = QPixmap(self.pixmap.size())
-            self.collision_layer.fill(QColor(255,255,255,0))
+            self.pixmap = ChunkedLayer.from_image(QImage(path), Qt.white)
+            self.collision_layer = ChunkedLayer(self.pixmap.width(), self.pixmap.height(), QColor(255,255,255,0))
             self.log(f"Loaded image: {path} ({self.pixmap.width()}x{self.pixmap.height()})")
             self.offset = [0.0, 0.0]
             self.zoom = 1.0
@@ -720,7 +804,7 @@ class EditorWindow(QMainWindow):
     def save_image(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save Map Image", "", "PNG Image (*.png)")
         if path:
-            self.pixmap.save(path, "PNG")
+            self.pixmap.to_image().save(path, "PNG")
             self.log(f"Saved image to {path}")
 
     def export_all(self):
@@ -741,10 +825,10 @@ class EditorWindow(QMainWindow):
             
         try:
             with zipfile.ZipFile(zip_path, 'w') as zip_file:
-                map_data = self._pixmap_to_bytes(self.pixmap)
+                map_data = self._pixmap_to_bytes(self.pixmap.to_image())
                 zip_file.writestr("map.png", map_data)
                 
-                collision_data = self._pixmap_to_bytes(self.collision_layer)
+                collision_data = self._pixmap_to_bytes(self.collision_layer.to_image())
                 zip_file.writestr("collision.png", collision_data)
                 
                 json_data = self._create_export_json()
@@ -756,7 +840,7 @@ class EditorWindow(QMainWindow):
             self.log(f"Export failed: {str(e)}")
 
     def _pixmap_to_bytes(self, pixmap):
-        """Convert QPixmap to bytes for zip export"""
+        """Convert QPixmap/QImage to bytes for zip export"""
         from PyQt5.QtCore import QBuffer, QIODevice
         buffer = QBuffer()
         buffer.open(QIODevice.WriteOnly)
@@ -770,7 +854,7 @@ class EditorWindow(QMainWindow):
         
         prefab_data = []
         for prefab in self.prefab_objects:
-            prefab_name = self._find_prefab_name_by_image(prefab["image"])
+            prefab_name = self._asset_export_name(prefab, "unknown_prefab")
             prefab_data.append({
                 "name": prefab_name,
                 "x": prefab["x"],
@@ -779,7 +863,7 @@ class EditorWindow(QMainWindow):
         
         npc_data = []
         for npc in self.npc_objects:
-            npc_name = self._find_npc_name_by_image(npc["image"])
+            npc_name = self._asset_export_name(npc, "unknown_npc")
             npc_data.append({
                 "name": npc_name,
                 "x": npc["x"],
@@ -801,8 +885,8 @@ class EditorWindow(QMainWindow):
         for i, spawn in enumerate(self.spawn_areas):
             spawn_data.append({
                 "id": i + 1,
-                "chunk_x": spawn["x"] // 32,
-                "chunk_y": spawn["y"] // 32
+                "chunk_x": spawn["x"] // SPAWN_CHUNK_SIZE,
+                "chunk_y": spawn["y"] // SPAWN_CHUNK_SIZE
             })
         
         export_data = {
@@ -820,89 +904,272 @@ class EditorWindow(QMainWindow):
         
         return json.dumps(export_data, indent=2)
 
-    def _find_prefab_name_by_image(self, target_image):
-        """Find the prefab name by matching the image"""
-        for category, prefabs in self.prefabs.items():
-            for prefab in prefabs:
-                if prefab["image"].cacheKey() == target_image.cacheKey():
-                    return f"{prefab['name']}_{category}"
-        return "unknown_prefab"
-
-    def _find_npc_name_by_image(self, target_image):
-        """Find the NPC name by matching the image"""
-        for category, npcs in self.npcs.items():
-            for npc in npcs:
-                if npc["image"].cacheKey() == target_image.cacheKey():
-                    return f"{npc['name']}_{category}"
-        return "unknown_npc"
+    def _asset_export_name(self, placed, fallback):
+        """Export name of a placed prefab/NPC, placeholders from a broken import have no asset"""
+        asset = placed.get("asset")
+        if asset is None:
+            return fallback
+        return f"{asset.name}_{asset.category}"
+
+    def _journal_layers(self):
+        return {"pixmap": self.pixmap, "collision_layer": self.collision_layer}
+
+    def _journal_object(self, name, placed):
+        """JSON for one object in the journal, prefabs and NPCs keep enough of their asset to load the image again"""
+        if name in ("prefab_objects", "npc_objects"):
+            asset = placed.get("asset")
+            fields = None
+            if isinstance(asset, AssetHandle):
+                fields = [asset.name, asset.category, asset.path, asset.sha, asset.collision_path, asset.collision_sha]
+            return {"x": placed["x"], "y": placed["y"], "asset": fields}
+        if name == "trigger_rectangles":
+            return {"start": list(placed["start"]), "end": list(placed["end"]), "command": placed["command"]}
+        return {"x": placed["x"], "y": placed["y"]}
+
+    def _object_from_journal(self, name, data):
+        if name in ("prefab_objects", "npc_objects"):
+            if data["asset"] is None:
+                # same placeholder import uses
+                return {"x": data["x"], "y": data["y"], "image": QPixmap(32, 32), "collision": None}
+            return self._asset_object(AssetHandle(*data["asset"], self.asset_source, self.image_cache), data["x"], data["y"])
+        if name == "trigger_rectangles":
+            return {"start": tuple(data["start"]), "end": tuple(data["end"]), "command": data["command"]}
+        return {"x": data["x"], "y": data["y"]}
+
+    def _asset_object(self, asset, x, y):
+        """Placed object for a library asset, shows the placeholder until _on_image_ready fills in the real images"""
+        placed = {"x": x, "y": y, "image": asset["image"], "collision": asset["collision"], "asset": asset}
+        if not asset.ready():
+            self.loading_objects.append(placed)
+        return placed
+
+    def _journal_objects(self):
+        """Header of a journal record with every object list and the enemy list, for checkpoints and imports"""
+        lists = {name: [self._journal_object(name, placed) for placed in getattr(self, name)] for name in self.object_indexes}
+        return {"op": "objects", "lists": lists, "enemy_list": list(self.enemy_list)}
+
+    def _journal_object_edit(self, edit):
+        after = None if edit.after is None else self._journal_object(edit.name, edit.after)
+        self.journal.append({"op": "object", "name": edit.name, "position": edit.position, "add": edit.before is None, "after": after})
+
+    def _checkpoint_journal(self, startup=False):
+        objects = self._journal_objects()
+        if startup:
+            # marks the checkpoint as the blank starting map, see EditJournal.has_edits
+            objects["startup"] = True
+        self.journal.checkpoint(self._journal_layers(), objects)
+
+    def _flush_journal(self):
+        """Timer tick, hands what changed since the last one to the journal thread or starts a fresh checkpoint"""
+        if self.journal.error is not None:
+            self.log(f"Journal write failed: {self.journal.error}")
+            self.journal.error = None
+        if self.stroke is not None:
+            return  # the stroke's painters are still writing to its chunks, they go in once it's finished
+        if self.journal.needs_checkpoint():
+            self._checkpoint_journal()
+        else:
+            self.journal.flush(self._journal_layers())
 
-    def _load_stamps(self):
-        """Load stamps organized by categories from GitHub repository"""
-        from PyQt5.QtGui import QPixmap
-        
-        self.stamps.clear()
-        
+    def _claim_orphaned_journals(self):
+        """Lock every journal whose editor isn't running any more, newest first, as [(path, lock)]"""
+        claimed = []
         try:
-            stamps_data = self._get_github_file_list("stamps")
-            if not stamps_data:
-                self.log("No stamps found in GitHub repository")
-                return
-                
-            for item in stamps_data:
-                if item['type'] == 'dir':
-                    category = item['name']
-                    self.stamps[category] = []
-                    
-                    category_data = self._get_github_file_list(f"stamps/{category}")
-                    if category_data:
-                        for file_item in category_data:
-                            if file_item['type'] == 'file' and file_item['name'].lower().endswith('.png') and not file_item['name'].lower().endswith('_collision.png'):
-                                name = file_item['name'][:-4]
-                                
-                                image = self._load_pixmap_from_github(f"stamps/{category}/{file_item['name']}")
-                                if not image:
-                                    continue
-                                    
-                                collision = None
-                                collision_path = f"stamps/{category}/{name}_collision.png"
-                                collision = self._load_pixmap_from_github(collision_path)
-                                
-                                self.stamps[category].append({
-                                    "name": name, 
-                                    "image": image, 
-                                    "collision": collision
-                                })
-            
-            total_stamps = sum(len(stamps) for stamps in self.stamps.values())
-            self.log(f"Loaded {total_stamps} stamps in {len(self.stamps)} categories from GitHub")
-            
-        except Exception as e:
-            self.log(f"Failed to load stamps from GitHub: {str(e)}")
+            names = os.listdir(JOURNAL_DIR)
+        except OSError:
+            return claimed
+        for name in names:
+            if not name.endswith(".journal"):
+                continue
+            path = os.path.join(JOURNAL_DIR, name)
+            lock = QLockFile(path + ".lock")
+            # never stale by age, tryLock only takes it over once the owning process is gone
+            lock.setStaleLockTime(0)
+            if not lock.tryLock(0):
+                continue
+            if not os.path.exists(path):
+                # its editor closed cleanly while we were looking
+                lock.unlock()
+                continue
+            try:
+                has_edits = EditJournal.has_edits(path)
+            except (OSError, ValueError, KeyError):
+                has_edits = True  # let the replay try and say what's wrong with it
+            if not has_edits:
+                # died before anything was drawn, asking about it would only hide older journals with real work
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                lock.unlock()
+                continue
+            claimed.append((path, lock))
+        claimed.sort(key=lambda c: os.path.getmtime(c[0]), reverse=True)
+        return claimed
+
+    def _offer_journal_recovery(self):
+        # the map can only come back from one of them, the rest stay locked until we're done asking
+        while self.orphaned_journals:
+            path, lock = self.orphaned_journals.pop(0)
+            answer = QMessageBox.question(self, "Recover Unsaved Work", "An editor didn't close properly. Replay its edit journal to get that work back?")
+            if answer == QMessageBox.Yes:
+                try:
+                    self._replay_journal(path)
+                except (OSError, ValueError, KeyError, IndexError, zlib.error) as e:
+                    self.log(f"Recovery failed: {str(e)}, the journal is still at {path}")
+                    lock.unlock()
+                    break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            lock.unlock()
+            if answer == QMessageBox.Yes:
+                break
+        # anything not asked about yet gets offered again next launch
+        for path, lock in self.orphaned_journals:
+            lock.unlock()
+        self.orphaned_journals = []
+
+    def _replay_journal(self, path):
+        """Rebuild the map from a journal, its checkpoint and then every edit written after it"""
+        layers = {}
+        for header, image in EditJournal.replay(path):
+            op = header["op"]
+            if op == "layer":
+                layers[header["layer"]] = ChunkedLayer(header["width"], header["height"], QColor.fromRgba(header["fill"]), header["chunk_size"])
+            elif op == "chunk":
+                # nothing has been drawn from these layers yet, so there are no levels or watchers to tell
+                chunks = layers[header["layer"]].chunks
+                if image is None:
+                    chunks.pop(tuple(header["key"]), None)
+                else:
+                    chunks[tuple(header["key"])] = image
+            elif op == "objects":
+                for name, items in header["lists"].items():
+                    setattr(self, name, [self._object_from_journal(name, data) for data in items])
+                self.enemy_list = header["enemy_list"]
+            elif op == "object":
+                name = header["name"]
+                objects = getattr(self, name)
+                before = None if header["add"] else objects[header["position"]]
+                after = None if header["after"] is None else self._object_from_journal(name, header["after"])
+                ObjectEdit(name, header["position"], before, after).apply(objects)
+            elif op == "enemies":
+                self.enemy_list = header["enemy_list"]
+        self._finish_recording()
+        self.pixmap = layers.get("pixmap", self.pixmap)
+        self.collision_layer = layers.get("collision_layer", self.collision_layer)
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._reindex_objects()
+        self._update_image_pins()
+        # the recovered map is this session's starting point
+        self._checkpoint_journal()
+        self.log(f"Recovered {self.pixmap.width()}x{self.pixmap.height()} map with {len(self.prefab_objects)} prefabs, {len(self.npc_objects)} NPCs, {len(self.trigger_rectangles)} triggers, {len(self.spawn_areas)} spawn areas")
+        self.update_canvas()
+
+    def _map_rect_to_widget(self, rect):
+        """Widget pixels covering a map rect, padded for the rounding sprites get when drawn"""
+        left = math.floor((rect.left() - self.offset[0]) * self.zoom) - 2
+        top = math.floor((rect.top() - self.offset[1]) * self.zoom) - 2
+        right = math.ceil((rect.right() + 1 - self.offset[0]) * self.zoom) + 2
+        bottom = math.ceil((rect.bottom() + 1 - self.offset[1]) * self.zoom) + 2
+        return QRect(left, top, right - left, bottom - top)
+
+    def _visible_objects(self, name, view):
+        """(list position, object) for everything in one of the object lists that overlaps the view rect"""
+        objects = getattr(self, name)
+        index = self.object_indexes[name]
+        x1, y1, x2, y2 = view
+        visible = []
+        for position in index.query(x1, y1, x2, y2):
+            ox1, oy1, ox2, oy2 = index.bounds(objects[position])
+            if ox1 <= x2 and ox2 >= x1 and oy1 <= y2 and oy2 >= y1:
+                visible.append((position, objects[position]))
+        return visible
+
+    def _index_new_object(self, name):
+        """Index the object that was just appended to one of the object lists"""
+        objects = getattr(self, name)
+        self.object_indexes[name].add(len(objects) - 1, objects[-1])
+        if name == "prefab_objects" and self.collision_view is not None:
+            x1, y1, x2, y2 = self.object_indexes[name].bounds(objects[-1])
+            self.collision_view.invalidate(QRect(x1, y1, x2 - x1, y2 - y1))
+
+    def _reindex_objects(self, *names):
+        """Rebuild the spatial index after a list was replaced or had something removed"""
+        for name in names or self.object_indexes:
+            self.object_indexes[name].rebuild(getattr(self, name))
+        if "prefab_objects" in (names or self.object_indexes):
+            self._drop_collision_view()
+
+    def _collision_view(self):
+        """Collision mode base layer (faded map, collision, faded prefabs), made again if the layers were swapped out"""
+        if self.collision_view is None or self.collision_view.sources != (self.pixmap, self.collision_layer):
+            self._drop_collision_view()
+            self.collision_view = CompositeLayer((self.pixmap, self.collision_layer), self._compose_collision_view)
+        return self.collision_view
+
+    def _drop_collision_view(self):
+        if self.collision_view is not None:
+            self.collision_view.detach()
+            self.collision_view = None
+
+    def _compose_collision_view(self, painter, rect):
+        """Blend one chunk of the collision mode view, same stacking _draw_canvas used to do every frame"""
+        area = QRectF(rect)
+        painter.setOpacity(0.3)
+        self.pixmap.render(painter, area, area)
+        painter.setOpacity(1.0)
+        self.collision_layer.render(painter, area, area)
+        painter.setOpacity(0.3)
+        view = (rect.left(), rect.top(), rect.right() + 1, rect.bottom() + 1)
+        for _, prefab_obj in self._visible_objects("prefab_objects", view):
+            painter.drawPixmap(prefab_obj["x"], prefab_obj["y"], prefab_obj["image"])
+        painter.setOpacity(1.0)
+
+    def _update_image_pins(self):
+        """Keep the images of everything placed on the map out of the image cache's eviction"""
+        keys = set()
+        for placed in self.prefab_objects + self.npc_objects:
+            asset = placed.get("asset")
+            if asset is not None:
+                keys.add(asset.key)
+                if asset.collision_key():
+                    keys.add(asset.collision_key())
+        self.image_cache.set_pinned(keys)
+
+    def _load_stamps(self):
+        """Load stamps organized by categories from the asset source"""
+        self._load_asset_libraries(["stamps"])
 
     def open_stamp_dialog(self):
         """Open dialog to select a stamp from categories"""
+        stamp = self._pick_asset("stamps", "Select Stamp", "Choose a stamp to place:", "a stamp")
+        if stamp is not None:
+            self.active_stamp = stamp
+            stamp.ready()
+            self.log(f"Selected stamp: {stamp.name} from {stamp.category}. Click on map to stamp.")
+            self.update_canvas()
+
+    def _asset_loading(self, asset):
+        """True (and says so) if a picked library asset is still being decoded"""
+        if isinstance(asset, AssetHandle) and not asset.ready():
+            self.log(f"{asset.name} is still loading, try again in a moment")
+            return True
+        return False
+
+    def _pick_asset(self, root, title, prompt, noun):
+        """Modal picker over a library's shared browser model, returns the chosen asset or None"""
         dlg = QDialog(self)
-        dlg.setWindowTitle("Select Stamp")
+        dlg.setWindowTitle(title)
         dlg.resize(400, 500)
         layout = QVBoxLayout()
         
-        tree = QTreeWidget()
-        tree.setHeaderLabel("Stamp Categories")
-        tree.setIconSize(QSize(32, 32))
-        
-        for category, stamps in self.stamps.items():
-            category_item = QTreeWidgetItem([category])
-            category_item.setExpanded(True)
-            tree.addTopLevelItem(category_item)
-            
-            for stamp in stamps:
-                stamp_item = QTreeWidgetItem([stamp["name"]])
-                icon = QIcon(stamp["image"].scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                stamp_item.setIcon(0, icon)
-                category_item.addChild(stamp_item)
-        
-        layout.addWidget(QLabel("Choose a stamp to place:"))
-        layout.addWidget(tree)
+        browser = AssetBrowserWidget(self.asset_models[root], expand_all=True)
+        layout.addWidget(QLabel(prompt))
+        layout.addWidget(browser)
         
         btn_layout = QHBoxLayout()
         select_btn = QPushButton("Select")
@@ -912,46 +1179,34 @@ class EditorWindow(QMainWindow):
         layout.addLayout(btn_layout)
         
         dlg.setLayout(layout)
+        chosen = []
         
-        def select_stamp():
-            current_item = tree.currentItem()
-            if current_item and current_item.parent():
-                category = current_item.parent().text(0)
-                stamp_name = current_item.text(0)
-                
-                for stamp in self.stamps[category]:
-                    if stamp["name"] == stamp_name:
-                        self.active_stamp = stamp
-                        self.stamp_preview_timer.start()
-                        self.log(f"Selected stamp: {stamp_name} from {category}. Click on map to stamp.")
-                        self.update_canvas()
-                        dlg.accept()
-                        return
-                self.log("Error: Could not find selected stamp")
-            else:
-                self.log("Please select a stamp")
+        def select(asset=None):
+            asset = asset or browser.selected_asset()
+            if asset is None:
+                self.log(f"Please select {noun}")
+                return
+            chosen.append(asset)
+            dlg.accept()
         
-        select_btn.clicked.connect(select_stamp)
+        select_btn.clicked.connect(lambda: select())
         cancel_btn.clicked.connect(dlg.reject)
-        tree.itemDoubleClicked.connect(lambda item, col: select_stamp())
+        browser.asset_activated.connect(select)
         
         dlg.exec_()
-
-    def _update_stamp_preview(self):
-        """Update stamp preview position from cursor"""
-        if self.active_stamp:
-            from PyQt5.QtGui import QCursor
-            global_pos = QCursor.pos()
-            widget_pos = self.image_label.mapFromGlobal(global_pos)
-            if self.image_label.rect().contains(widget_pos):
-                self.stamp_preview_pos = (widget_pos.x(), widget_pos.y())
-                self.update_canvas()
+        # the model outlives every picker, don't leave it a dead dialog to expand
+        browser.detach()
+        dlg.deleteLater()
+        return chosen[0] if chosen else None
 
     def _stamp_at(self, widget_pos):
         """Place the active stamp at the given widget position"""
         if not self.active_stamp:
             return
             
+        if self._asset_loading(self.active_stamp):
+            return
+            
         self._push_undo_action('stamp')
         
         img = self.active_stamp["image"]
@@ -963,140 +1218,33 @@ class EditorWindow(QMainWindow):
         px = img_x - img_w // 2
         py = img_y - img_h // 2
         
-        painter = QPainter(self.pixmap)
-        painter.drawPixmap(px, py, img)
-        painter.end()
+        self.pixmap.draw_pixmap(px, py, img)
         
         if self.active_stamp["collision"]:
-            painter = QPainter(self.collision_layer)
-            painter.drawPixmap(px, py, self.active_stamp["collision"])
-            painter.end()
+            self.collision_layer.draw_pixmap(px, py, self.active_stamp["collision"])
         
-        self.stamp_preview_timer.stop()
         self.active_stamp = None
         self.stamp_preview_pos = None
         self.log(f"Stamped: {img_w}x{img_h} at ({px},{py})")
         self.update_canvas()
 
     def _load_prefabs(self):
-        """Load prefabs organized by categories from GitHub repository"""
-        from PyQt5.QtGui import QPixmap
-        
-        self.prefabs.clear()
-        
-        try:
-            prefabs_data = self._get_github_file_list("prefabs")
-            if not prefabs_data:
-                self.log("No prefabs found in GitHub repository")
-                return
-                
-            for item in prefabs_data:
-                if item['type'] == 'dir':
-                    category = item['name']
-                    self.prefabs[category] = []
-                    
-                    category_data = self._get_github_file_list(f"prefabs/{category}")
-                    if category_data:
-                        for file_item in category_data:
-                            if file_item['type'] == 'file' and file_item['name'].lower().endswith('.png') and not file_item['name'].lower().endswith('_collision.png'):
-                                name = file_item['name'][:-4]
-                                
-                                # Load main image
-                                image = self._load_pixmap_from_github(f"prefabs/{category}/{file_item['name']}")
-                                if not image:
-                                    continue
-                                    
-                                # Try to load collision image
-                                collision = None
-                                collision_path = f"prefabs/{category}/{name}_collision.png"
-                                collision = self._load_pixmap_from_github(collision_path)
-                                
-                                self.prefabs[category].append({
-                                    "name": name, 
-                                    "image": image, 
-                                    "collision": collision
-                                })
-            
-            total_prefabs = sum(len(prefabs) for prefabs in self.prefabs.values())
-            self.log(f"Loaded {total_prefabs} prefabs in {len(self.prefabs)} categories from GitHub")
-            
-        except Exception as e:
-            self.log(f"Failed to load prefabs from GitHub: {str(e)}")
+        """Load prefabs organized by categories from the asset source"""
+        self._load_asset_libraries(["prefabs"])
 
     def open_prefab_dialog(self):
         """Open dialog to select a prefab from categories"""
-        dlg = QDialog(self)
-        dlg.setWindowTitle("Select Prefab")
-        dlg.resize(400, 500)
-        layout = QVBoxLayout()
-        
-        tree = QTreeWidget()
-        tree.setHeaderLabel("Prefab Categories")
-        tree.setIconSize(QSize(32, 32))
-        
-        for category, prefabs in self.prefabs.items():
-            category_item = QTreeWidgetItem([category])
-            category_item.setExpanded(True)
-            tree.addTopLevelItem(category_item)
-            
-            for prefab in prefabs:
-                prefab_item = QTreeWidgetItem([prefab["name"]])
-                icon = QIcon(prefab["image"].scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                prefab_item.setIcon(0, icon)
-                category_item.addChild(prefab_item)
-        
-        layout.addWidget(QLabel("Choose a prefab to place:"))
-        layout.addWidget(tree)
-        
-        btn_layout = QHBoxLayout()
-        select_btn = QPushButton("Select")
-        cancel_btn = QPushButton("Cancel")
-        btn_layout.addWidget(select_btn)
-        btn_layout.addWidget(cancel_btn)
-        layout.addLayout(btn_layout)
-        
-        dlg.setLayout(layout)
-        
-        def select_prefab():
-            current_item = tree.currentItem()
-            if current_item and current_item.parent():
-                category = current_item.parent().text(0)
-                prefab_name = current_item.text(0)
-                
-                for prefab in self.prefabs[category]:
-                    if prefab["name"] == prefab_name:
-                        self.active_prefab = prefab
-                        self.prefab_preview_timer.start()
-                        self.log(f"Selected prefab: {prefab_name} from {category}. Click on map to place.")
-                        self.update_canvas()
-                        dlg.accept()
-                        return
-                self.log("Error: Could not find selected prefab")
-            else:
-                self.log("Please select a prefab")
-        
-        select_btn.clicked.connect(select_prefab)
-        cancel_btn.clicked.connect(dlg.reject)
-        tree.itemDoubleClicked.connect(lambda item, col: select_prefab())
-        
-        dlg.exec_()
-
-    def _update_prefab_preview(self):
-        """Update prefab preview position from cursor"""
-        if self.active_prefab:
-            from PyQt5.QtGui import QCursor
-            global_pos = QCursor.pos()
-            widget_pos = self.image_label.mapFromGlobal(global_pos)
-            if self.image_label.rect().contains(widget_pos):
-                self.prefab_preview_pos = (widget_pos.x(), widget_pos.y())
-                self.update_canvas()
+        prefab = self._pick_asset("prefabs", "Select Prefab", "Choose a prefab to place:", "a prefab")
+        if prefab is not None:
+            self.active_prefab = prefab
+            prefab.ready()
+            self.log(f"Selected prefab: {prefab.name} from {prefab.category}. Click on map to place.")
+            self.update_canvas()
 
     def _place_prefab_at(self, widget_pos):
         """Place the active prefab at the given widget position"""
-        if not self.active_prefab:
+        if not self.active_prefab or self._asset_loading(self.active_prefab):
             return
-            
-        self._push_undo_action('prefab')
         
         img = self.active_prefab["image"]
         img_w = img.width()
@@ -1107,141 +1255,42 @@ class EditorWindow(QMainWindow):
         px = img_x - img_w // 2
         py = img_y - img_h // 2
         
-        self.prefab_objects.append({
+        edit = ObjectEdit("prefab_objects", len(self.prefab_objects), None, {
             "image": img,
             "x": px,
             "y": py,
-            "collision": self.active_prefab["collision"]
+            "collision": self.active_prefab["collision"],
+            "asset": self.active_prefab
         })
+        self._push_undo_action('prefab', edit)
+        self._apply_object_edit(edit)
+        self._update_image_pins()
         
         if self.active_prefab["collision"]:
-            painter = QPainter(self.collision_layer)
-            painter.drawPixmap(px, py, self.active_prefab["collision"])
-            painter.end()
+            self.collision_layer.draw_pixmap(px, py, self.active_prefab["collision"])
         
-        self.prefab_preview_timer.stop()
         self.active_prefab = None
         self.prefab_preview_pos = None
         self.log(f"Placed prefab: {img_w}x{img_h} at ({px},{py})")
         self.update_canvas()
 
     def _load_npcs(self):
-        """Load NPCs organized by categories from GitHub repository"""
-        from PyQt5.QtGui import QPixmap
-        
-        self.npcs.clear()
-        
-        try:
-            npcs_data = self._get_github_file_list("npcs")
-            if not npcs_data:
-                self.log("No NPCs found in GitHub repository")
-                return
-                
-            for item in npcs_data:
-                if item['type'] == 'dir':
-                    category = item['name']
-                    self.npcs[category] = []
-                    
-                    category_data = self._get_github_file_list(f"npcs/{category}")
-                    if category_data:
-                        for file_item in category_data:
-                            if file_item['type'] == 'file' and file_item['name'].lower().endswith('.png') and not file_item['name'].lower().endswith('_collision.png'):
-                                name = file_item['name'][:-4]
-                                
-                                image = self._load_pixmap_from_github(f"npcs/{category}/{file_item['name']}")
-                                if not image:
-                                    continue
-                                    
-                                collision = None
-                                collision_path = f"npcs/{category}/{name}_collision.png"
-                                collision = self._load_pixmap_from_github(collision_path)
-                                
-                                self.npcs[category].append({
-                                    "name": name, 
-                                    "image": image, 
-                                    "collision": collision
-                                })
-            
-            total_npcs = sum(len(npcs) for npcs in self.npcs.values())
-            self.log(f"Loaded {total_npcs} NPCs in {len(self.npcs)} categories from GitHub")
-            
-        except Exception as e:
-            self.log(f"Failed to load NPCs from GitHub: {str(e)}")
+        """Load NPCs organized by categories from the asset source"""
+        self._load_asset_libraries(["npcs"])
 
     def open_npc_dialog(self):
         """Open dialog to select an NPC from categories"""
-        dlg = QDialog(self)
-        dlg.setWindowTitle("Select NPC")
-        dlg.resize(400, 500)
-        layout = QVBoxLayout()
-        
-        tree = QTreeWidget()
-        tree.setHeaderLabel("NPC Categories")
-        tree.setIconSize(QSize(32, 32))
-        
-        for category, npcs in self.npcs.items():
-            category_item = QTreeWidgetItem([category])
-            category_item.setExpanded(True)
-            tree.addTopLevelItem(category_item)
-            
-            for npc in npcs:
-                npc_item = QTreeWidgetItem([npc["name"]])
-                icon = QIcon(npc["image"].scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                npc_item.setIcon(0, icon)
-                category_item.addChild(npc_item)
-        
-        layout.addWidget(QLabel("Choose an NPC to place:"))
-        layout.addWidget(tree)
-        
-        btn_layout = QHBoxLayout()
-        select_btn = QPushButton("Select")
-        cancel_btn = QPushButton("Cancel")
-        btn_layout.addWidget(select_btn)
-        btn_layout.addWidget(cancel_btn)
-        layout.addLayout(btn_layout)
-        
-        dlg.setLayout(layout)
-        
-        def select_npc():
-            current_item = tree.currentItem()
-            if current_item and current_item.parent():
-                category = current_item.parent().text(0)
-                npc_name = current_item.text(0)
-                
-                for npc in self.npcs[category]:
-                    if npc["name"] == npc_name:
-                        self.active_npc = npc
-                        self.npc_preview_timer.start()
-                        self.log(f"Selected NPC: {npc_name} from {category}. Click on map to place.")
-                        self.update_canvas()
-                        dlg.accept()
-                        return
-                self.log("Error: Could not find selected NPC")
-            else:
-                self.log("Please select an NPC")
-        
-        select_btn.clicked.connect(select_npc)
-        cancel_btn.clicked.connect(dlg.reject)
-        tree.itemDoubleClicked.connect(lambda item, col: select_npc())
-        
-        dlg.exec_()
-
-    def _update_npc_preview(self):
-        """Update NPC preview position from cursor"""
-        if self.active_npc:
-            from PyQt5.QtGui import QCursor
-            global_pos = QCursor.pos()
-            widget_pos = self.image_label.mapFromGlobal(global_pos)
-            if self.image_label.rect().contains(widget_pos):
-                self.npc_preview_pos = (widget_pos.x(), widget_pos.y())
-                self.update_canvas()
+        npc = self._pick_asset("npcs", "Select NPC", "Choose an NPC to place:", "an NPC")
+        if npc is not None:
+            self.active_npc = npc
+            npc.ready()
+            self.log(f"Selected NPC: {npc.name} from {npc.category}. Click on map to place.")
+            self.update_canvas()
 
     def _place_npc_at(self, widget_pos):
         """Place the active NPC at the given widget position"""
-        if not self.active_npc:
+        if not self.active_npc or self._asset_loading(self.active_npc):
             return
-            
-        self._push_undo_action('npc')
         
         img = self.active_npc["image"]
         img_w = img.width()
@@ -1252,56 +1301,80 @@ class EditorWindow(QMainWindow):
         px = img_x - img_w // 2
         py = img_y - img_h // 2
         
-        self.npc_objects.append({
+        edit = ObjectEdit("npc_objects", len(self.npc_objects), None, {
             "image": img,
             "x": px,
             "y": py,
-            "collision": self.active_npc["collision"]
+            "collision": self.active_npc["collision"],
+            "asset": self.active_npc
         })
+        self._push_undo_action('npc', edit)
+        self._apply_object_edit(edit)
+        self._update_image_pins()
         
         if self.active_npc["collision"]:
-            painter = QPainter(self.collision_layer)
-            painter.drawPixmap(px, py, self.active_npc["collision"])
-            painter.end()
+            self.collision_layer.draw_pixmap(px, py, self.active_npc["collision"])
         
-        self.npc_preview_timer.stop()
         self.active_npc = None
         self.npc_preview_pos = None
         self.log(f"Placed NPC: {img_w}x{img_h} at ({px},{py})")
         self.update_canvas()
 
-    def _push_undo_action(self, action_type):
+    def _push_undo_action(self, action_type, edit=None):
+        """Start an undo entry, object actions pass the ObjectEdit they're about to make"""
+        self._finish_recording()
         state = {'type': action_type}
         if action_type == 'paint':
-            state['pixmap'] = self.pixmap.copy()
+            state['pixmap'] = self._record_layer('pixmap')
         elif action_type == 'collision':
-            state['collision_layer'] = self.collision_layer.copy()
+            state['collision_layer'] = self._record_layer('collision_layer')
         elif action_type == 'stamp':
-            state['pixmap'] = self.pixmap.copy()
-            state['collision_layer'] = self.collision_layer.copy()
-        elif action_type == 'prefab':
-            state['collision_layer'] = self.collision_layer.copy()
-            state['prefab_objects'] = self.prefab_objects.copy()
-        elif action_type == 'npc':
-            state['collision_layer'] = self.collision_layer.copy()
-            state['npc_objects'] = self.npc_objects.copy()
-        elif action_type == 'trigger':
-            state['trigger_rectangles'] = self.trigger_rectangles.copy()
-        elif action_type == 'spawn':
-            state['spawn_areas'] = self.spawn_areas.copy()
+            state['pixmap'] = self._record_layer('pixmap')
+            state['collision_layer'] = self._record_layer('collision_layer')
+        elif action_type in ('prefab', 'npc'):
+            state['collision_layer'] = self._record_layer('collision_layer')
+            state['object'] = edit.reversed()
+        elif action_type in ('trigger', 'spawn'):
+            state['object'] = edit.reversed()
         elif action_type == 'resize':
-            state['pixmap'] = self.pixmap.copy()
-            state['collision_layer'] = self.collision_layer.copy()
+            # resizing makes new layers and leaves these ones alone, so keeping hold of them is all it takes
+            state['pixmap'] = LayerDelta(self.pixmap)
+            state['collision_layer'] = LayerDelta(self.collision_layer)
         self.undo_stack.append(state)
         self.redo_stack.clear()
 
+    def _record_layer(self, name):
+        """Undo entry for a layer that collects the old contents of each chunk painted on until the next entry for it"""
+        layer = getattr(self, name)
+        delta = LayerDelta(layer)
+        layer.recording = delta
+        return delta
+
+    def _finish_recording(self):
+        """Stop the layers adding to the last undo entry and cut what it saved down to the areas that changed"""
+        # a stroke left open would keep painting into the next entry
+        self._end_stroke()
+        for layer in (self.pixmap, self.collision_layer):
+            if layer.recording is not None:
+                layer.recording.compact()
+                layer.recording = None
+
+    def _undo_layer_bytes(self, state):
+        """Memory an undo/redo entry keeps alive through layers that aren't in use any more, for what they don't share"""
+        total = 0
+        for name, saved in state.items():
+            if isinstance(saved, LayerDelta):
+                current = getattr(self, name)
+                if saved.layer is not current:
+                    total += saved.layer.nbytes(shared_with=current)
+        return total
+
     def undo(self):
         if not self.undo_stack:
             self.log("Nothing to undo.")
             return
         state = self.undo_stack.pop()
-        self.redo_stack.append(self._capture_current_state(state['type']))
-        self._restore_state(state)
+        self.redo_stack.append(self._restore_state(state))
         self.update_canvas()
         self.log("Undo.")
 
@@ -1310,102 +1383,85 @@ class EditorWindow(QMainWindow):
             self.log("Nothing to redo.")
             return
         state = self.redo_stack.pop()
-        self.undo_stack.append(self._capture_current_state(state['type']))
-        self._restore_state(state)
+        self.undo_stack.append(self._restore_state(state))
         self.update_canvas()
         self.log("Redo.")
 
-    def _capture_current_state(self, action_type):
-        state = {'type': action_type}
-        if action_type == 'paint':
-            state['pixmap'] = self.pixmap.copy()
-        elif action_type == 'collision':
-            state['collision_layer'] = self.collision_layer.copy()
-        elif action_type == 'stamp':
-            state['pixmap'] = self.pixmap.copy()
-            state['collision_layer'] = self.collision_layer.copy()
-        elif action_type == 'prefab':
-            state['collision_layer'] = self.collision_layer.copy()
-            state['prefab_objects'] = self.prefab_objects.copy()
-        elif action_type == 'npc':
-            state['collision_layer'] = self.collision_layer.copy()
-            state['npc_objects'] = self.npc_objects.copy()
-        elif action_type == 'trigger':
-            state['trigger_rectangles'] = self.trigger_rectangles.copy()
-        elif action_type == 'spawn':
-            state['spawn_areas'] = self.spawn_areas.copy()
-        elif action_type == 'resize':
-            state['pixmap'] = self.pixmap.copy()
-            state['collision_layer'] = self.collision_layer.copy()
-        return state
-
     def _restore_state(self, state):
-        if state['type'] == 'paint':
-            self.pixmap = state['pixmap']
-        elif state['type'] == 'collision':
-            self.collision_layer = state['collision_layer']
-        elif state['type'] == 'stamp':
-            self.pixmap = state['pixmap']
-            self.collision_layer = state['collision_layer']
-        elif state['type'] == 'prefab':
-            self.collision_layer = state['collision_layer']
-            self.prefab_objects = state['prefab_objects']
-        elif state['type'] == 'npc':
-            self.collision_layer = state['collision_layer']
-            self.npc_objects = state['npc_objects']
-        elif state['type'] == 'trigger':
-            self.trigger_rectangles = state['trigger_rectangles']
-        elif state['type'] == 'spawn':
-            self.spawn_areas = state['spawn_areas']
-        elif state['type'] == 'resize':
-            self.pixmap = state['pixmap']
-            self.collision_layer = state['collision_layer']
-
-    def _paint_at(self, widget_pos):
-        img_x = int(round(self.offset[0] + (widget_pos.x() - 4) / self.zoom))
-        img_y = int(round(self.offset[1] + (widget_pos.y() - 3) / self.zoom))
-        
-        if not (0 <= img_x < self.pixmap.width() and 0 <= img_y < self.pixmap.height()):
-            return
-        painter = QPainter(self.pixmap)
-        color = QColor(Qt.white) if self.eraser_mode else self.active_color
-        painter.setPen(color)
-        painter.setBrush(color)
-        if self.brush_size == 1:
-            painter.drawPoint(img_x, img_y)
+        """Put back what an undo/redo entry saved, returns the entry that reverses it"""
+        # whatever was being recorded is finished, the next edit starts its own entry
+        self._finish_recording()
+        inverse = {'type': state['type']}
+        for name, saved in state.items():
+            if name == 'type':
+                continue
+            if isinstance(saved, ObjectEdit):
+                inverse[name] = self._apply_object_edit(saved)
+                continue
+            current = getattr(self, name)
+            if isinstance(saved, LayerDelta):
+                swapped = saved.restore()
+                # swapped back in place if it's still the same layer, otherwise just switch back to the current one
+                inverse[name] = swapped if saved.layer is current else LayerDelta(current)
+                setattr(self, name, saved.layer)
+            else:
+                inverse[name] = current
+                setattr(self, name, saved)
+        if state['type'] in ('prefab', 'npc'):
+            self._update_image_pins()
+        return inverse
+
+    def _apply_object_edit(self, edit):
+        """Make an ObjectEdit and keep the spatial index up with it, returns the edit that reverses it"""
+        objects = getattr(self, edit.name)
+        inverse = edit.apply(objects)
+        self._journal_object_edit(edit)
+        if edit.before is None and edit.position == len(objects) - 1:
+            self._index_new_object(edit.name)
         else:
-            painter.drawRect(img_x, img_y, self.brush_size, self.brush_size)
-        painter.end()
-        self.update_canvas()
+            self._reindex_objects(edit.name)
+        return inverse
 
-    def _paint_collision_at(self, widget_pos):
+    def _begin_stroke(self, widget_pos):
+        """Mouse down with the brush, starts an undo entry and a stroke on whichever layer is being edited"""
+        if self.collision_mode:
+            self._push_undo_action('collision')
+            self.stroke = StrokeSession(self.collision_layer, self.brush_size, self.collision_color, clear=self.eraser_mode)
+        else:
+            self._push_undo_action('paint')
+            color = QColor(Qt.white) if self.eraser_mode else self.active_color
+            self.stroke = StrokeSession(self.pixmap, self.brush_size, color)
+        self._continue_stroke(widget_pos)
+
+    def _continue_stroke(self, widget_pos):
         img_x = int(round(self.offset[0] + (widget_pos.x() - 4) / self.zoom))
         img_y = int(round(self.offset[1] + (widget_pos.y() - 3) / self.zoom))
-        
-        if not (0 <= img_x < self.collision_layer.width() and 0 <= img_y < self.collision_layer.height()):
-            return
-        painter = QPainter(self.collision_layer)
-        
-        if self.eraser_mode:
-            color = QColor(255, 255, 255, 0)
-            painter.setCompositionMode(QPainter.CompositionMode_Clear)
-        else:
-            color = self.collision_color
-            painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
-            
-        painter.setPen(color)
-        painter.setBrush(color)
-        if self.brush_size == 1:
-            painter.drawPoint(img_x, img_y)
-        else:
-            painter.drawRect(img_x, img_y, self.brush_size, self.brush_size)
-        painter.end()
-        self.update_canvas()
+        changed = self.stroke.add(img_x, img_y)
+        if not changed.isEmpty():
+            # straight to the widget, update_canvas would restyle the palette on every mouse move
+            self.canvas_widget.update(self._map_rect_to_widget(changed))
+
+    def _end_stroke(self):
+        if self.stroke is not None:
+            self.stroke.end()
+            self.stroke = None
 
     def resizeEvent(self, event):
         self.update_canvas()
         super().resizeEvent(event)
 
+    def closeEvent(self, event):
+        self.asset_fetcher.shutdown()
+        self.thumbnails.shutdown()
+        self.image_cache.shutdown()
+        self.undo_stack.shutdown()
+        self.redo_stack.shutdown()
+        self.journal_timer.stop()
+        self.journal.close()
+        self.journal_lock.unlock()
+        self.asset_cache.save()
+        super().closeEvent(event)
+
     def toggle_trigger_mode(self):
         """Toggle trigger creation mode"""
         self.trigger_mode = not self.trigger_mode
@@ -1454,7 +1510,9 @@ class EditorWindow(QMainWindow):
             "command": ""
         }
         
-        self.trigger_rectangles.append(trigger)
+        edit = ObjectEdit("trigger_rectangles", len(self.trigger_rectangles), None, trigger)
+        self._push_undo_action('trigger', edit)
+        self._apply_object_edit(edit)
         self.active_trigger_edit = len(self.trigger_rectangles) - 1
         
         self._open_trigger_command_dialog()
@@ -1492,12 +1550,15 @@ class EditorWindow(QMainWindow):
         
         def save_command():
             trigger["command"] = command_edit.toPlainText()
+            self._journal_object_edit(ObjectEdit("trigger_rectangles", self.active_trigger_edit, trigger, trigger))
             self.log(f"Trigger command saved: {trigger['command'][:30]}...")
             dlg.accept()
         
         def cancel_command():
             if self.active_trigger_edit is not None:
-                self.trigger_rectangles.pop(self.active_trigger_edit)
+                # the trigger never happened, so neither does its undo entry
+                self.undo_stack.pop()
+                self._apply_object_edit(ObjectEdit("trigger_rectangles", self.active_trigger_edit, trigger, None))
                 self.log("Trigger creation cancelled")
             dlg.reject()
         
@@ -1510,7 +1571,10 @@ class EditorWindow(QMainWindow):
     def _delete_trigger(self, trigger_index):
         """Delete a trigger rectangle"""
         if 0 <= trigger_index < len(self.trigger_rectangles):
-            trigger = self.trigger_rectangles.pop(trigger_index)
+            trigger = self.trigger_rectangles[trigger_index]
+            edit = ObjectEdit("trigger_rectangles", trigger_index, trigger, None)
+            self._push_undo_action('trigger', edit)
+            self._apply_object_edit(edit)
             self.log(f"Deleted trigger: {trigger['command'][:30]}...")
             self.update_canvas()
 
@@ -1545,8 +1609,12 @@ class EditorWindow(QMainWindow):
         dlg.setLayout(layout)
         
         def save_command():
-            trigger["command"] = command_edit.toPlainText()
-            self.log(f"Trigger {trigger_index + 1} command saved: {trigger['command'][:30]}...")
+            # a new dict rather than changing this one, undo puts the old one back
+            edited = dict(trigger, command=command_edit.toPlainText())
+            edit = ObjectEdit("trigger_rectangles", trigger_index, trigger, edited)
+            self._push_undo_action('trigger', edit)
+            self._apply_object_edit(edit)
+            self.log(f"Trigger {trigger_index + 1} command saved: {edited['command'][:30]}...")
             dlg.accept()
         
         def delete_trigger():
@@ -1579,15 +1647,17 @@ class EditorWindow(QMainWindow):
         img_x = int(self.offset[0] + widget_pos.x() / self.zoom)
         img_y = int(self.offset[1] + widget_pos.y() / self.zoom)
         
-        spawn_x = (img_x // 32) * 32
-        spawn_y = (img_y // 32) * 32
+        spawn_x = (img_x // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
+        spawn_y = (img_y // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
         
         spawn_area = {
             "x": spawn_x,
             "y": spawn_y
         }
         
-        self.spawn_areas.append(spawn_area)
+        edit = ObjectEdit("spawn_areas", len(self.spawn_areas), None, spawn_area)
+        self._push_undo_action('spawn', edit)
+        self._apply_object_edit(edit)
         
         self.log(f"Created spawn area at ({spawn_x},{spawn_y})")
         self.update_canvas()
@@ -1608,34 +1678,34 @@ class EditorWindow(QMainWindow):
             spawn_x = spawn_area["x"]
             spawn_y = spawn_area["y"]
             
-            if spawn_x <= img_x < spawn_x + 32 and spawn_y <= img_y < spawn_y + 32:
+            if spawn_x <= img_x < spawn_x + SPAWN_CHUNK_SIZE and spawn_y <= img_y < spawn_y + SPAWN_CHUNK_SIZE:
                 self._delete_spawn_area(i)
                 return True
         
         return False
 # thank you chatgpt!
     def eventFilter(self, obj, event):
-        if obj is self.image_label:
+        if obj is self.canvas_widget:
             if event.type() == event.MouseMove:
                 if self.active_stamp:
-                    self.stamp_preview_pos = (event.pos().x(), event.pos().y())
-                    self.update_canvas()
+                    self._move_preview("stamp_preview_pos", self.active_stamp["image"], event.pos())
                 elif self.active_prefab:
-                    self.prefab_preview_pos = (event.pos().x(), event.pos().y())
-                    self.update_canvas()
+                    self._move_preview("prefab_preview_pos", self.active_prefab["image"], event.pos())
                 elif self.active_npc:
-                    self.npc_preview_pos = (event.pos().x(), event.pos().y())
-                    self.update_canvas()
+                    self._move_preview("npc_preview_pos", self.active_npc["image"], event.pos())
                 elif self.trigger_mode and self.trigger_start_pos:
                     self.trigger_end_pos = (event.pos().x(), event.pos().y())
                     self.update_canvas()
                 elif self.active_tile_stamp:
                     img_x = self.offset[0] + event.pos().x() / self.zoom
                     img_y = self.offset[1] + event.pos().y() / self.zoom
-                    snap_x = int(img_x // 32) * 32
-                    snap_y = int(img_y // 32) * 32
-                    self.tile_stamp_preview_pos = (snap_x, snap_y)
-                    self.update_canvas()
+                    snap_x = int(img_x // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
+                    snap_y = int(img_y // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
+                    if self.tile_stamp_preview_pos != (snap_x, snap_y):
+                        # only the squares the preview left and moved onto need redrawing
+                        dirty = self._tile_stamp_rect(self.tile_stamp_preview_pos).united(self._tile_stamp_rect((snap_x, snap_y)))
+                        self.tile_stamp_preview_pos = (snap_x, snap_y)
+                        self.update_canvas(dirty)
             
             if event.type() == event.MouseButtonPress:
                 if event.button() == Qt.MiddleButton:
@@ -1712,8 +1782,7 @@ class EditorWindow(QMainWindow):
                 elif event.type() == event.MouseButtonRelease:
                     return True
                 elif event.type() == event.Leave:
-                    self.stamp_preview_pos = None
-                    self.update_canvas()
+                    self._move_preview("stamp_preview_pos", self.active_stamp["image"], None)
                     return True
 
             if self.active_prefab:
@@ -1723,8 +1792,7 @@ class EditorWindow(QMainWindow):
                 elif event.type() == event.MouseButtonRelease:
                     return True
                 elif event.type() == event.Leave:
-                    self.prefab_preview_pos = None
-                    self.update_canvas()
+                    self._move_preview("prefab_preview_pos", self.active_prefab["image"], None)
                     return True
 
             if self.active_npc:
@@ -1734,50 +1802,42 @@ class EditorWindow(QMainWindow):
                 elif event.type() == event.MouseButtonRelease:
                     return True
                 elif event.type() == event.Leave:
-                    self.npc_preview_pos = None
-                    self.update_canvas()
+                    self._move_preview("npc_preview_pos", self.active_npc["image"], None)
                     return True
 
             if not getattr(self, "tile_editor_mode", False):
                 if event.type() == event.MouseButtonPress:
                     if event.button() == Qt.LeftButton:
-                        if self.collision_mode:
-                            self._push_undo_action('collision')
-                            self.drawing = True
-                            self._paint_collision_at(event.pos())
-                        else:
-                            self._push_undo_action('paint')
-                            self.drawing = True
-                            self._paint_at(event.pos())
+                        self._begin_stroke(event.pos())
                 elif event.type() == event.MouseMove:
-                    if self.drawing and (event.buttons() & Qt.LeftButton):
-                        if self.collision_mode:
-                            self._paint_collision_at(event.pos())
-                        else:
-                            self._paint_at(event.pos())
+                    if self.stroke is not None and (event.buttons() & Qt.LeftButton):
+                        self._continue_stroke(event.pos())
                 elif event.type() == event.MouseButtonRelease:
-                    if event.button() == Qt.LeftButton:
-                        self.drawing = False
+                    if event.button() == Qt.LeftButton and self.stroke is not None:
+                        # the stroke is done, so is its undo entry
+                        self._finish_recording()
 
             if self.active_tile_stamp:
                 if event.type() == event.MouseButtonPress and event.button() == Qt.LeftButton:
                     img_x = int(self.offset[0] + event.pos().x() / self.zoom)
                     img_y = int(self.offset[1] + event.pos().y() / self.zoom)
-                    snap_x = int(img_x // 32) * 32
-                    snap_y = int(img_y // 32) * 32
-                    self._place_tile_stamp((snap_x, snap_y))
-                    self.update_canvas()
+                    snap_x = int(img_x // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
+                    snap_y = int(img_y // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
+                    if self._asset_loading(self.active_tile_stamp):
+                        return True
+                    # one undo entry for the whole drag, it picks up every chunk the tiles land on
+                    self._push_undo_action('stamp')
+                    self.update_canvas(self._place_tile_stamp((snap_x, snap_y)))
                     self.tile_drawing = True
                     self.last_tile_stamp_pos = (snap_x, snap_y)
                     return True
                 elif event.type() == event.MouseMove and self.tile_drawing and (event.buttons() & Qt.LeftButton):
                     img_x = int(self.offset[0] + event.pos().x() / self.zoom)
                     img_y = int(self.offset[1] + event.pos().y() / self.zoom)
-                    snap_x = int(img_x // 32) * 32
-                    snap_y = int(img_y // 32) * 32
+                    snap_x = int(img_x // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
+                    snap_y = int(img_y // SPAWN_CHUNK_SIZE) * SPAWN_CHUNK_SIZE
                     if self.last_tile_stamp_pos != (snap_x, snap_y):
-                        self._place_tile_stamp((snap_x, snap_y))
-                        self.update_canvas()
+                        self.update_canvas(self._place_tile_stamp((snap_x, snap_y)))
                         self.last_tile_stamp_pos = (snap_x, snap_y)
                     return True
                 elif event.type() == event.MouseButtonRelease and event.button() == Qt.LeftButton:
@@ -1802,18 +1862,6 @@ class EditorWindow(QMainWindow):
         
         return False
 
-    def _setup_refresh_rate(self):
-        """Set up the stamp preview timer to match display refresh rate"""
-        screen = QApplication.primaryScreen()
-        refresh_rate = screen.refreshRate()
-        if refresh_rate > 0:
-            interval = int(1000 / refresh_rate)
-            self.stamp_preview_timer.setInterval(interval)
-            self.log(f"Stamp preview timer set to {refresh_rate}Hz ({interval}ms)")
-        else:
-            self.stamp_preview_timer.setInterval(16)
-            self.log("Stamp preview timer set to 60Hz (fallback)")
-
     def toggle_grid(self):
         """Toggle the 32x32 grid overlay"""
         self.show_grid = not self.show_grid
@@ -1824,7 +1872,10 @@ class EditorWindow(QMainWindow):
     def _delete_spawn_area(self, spawn_index):
         """Delete a spawn area"""
         if 0 <= spawn_index < len(self.spawn_areas):
-            spawn_area = self.spawn_areas.pop(spawn_index)
+            spawn_area = self.spawn_areas[spawn_index]
+            edit = ObjectEdit("spawn_areas", spawn_index, spawn_area, None)
+            self._push_undo_action('spawn', edit)
+            self._apply_object_edit(edit)
             self.log(f"Deleted spawn area at ({spawn_area['x']},{spawn_area['y']})")
             self.update_canvas()
 
@@ -1855,6 +1906,7 @@ class EditorWindow(QMainWindow):
         def save_enemy_list():
             text = enemy_edit.toPlainText()
             self.enemy_list = [line.strip() for line in text.split('\n') if line.strip()]
+            self.journal.append({"op": "enemies", "enemy_list": list(self.enemy_list)})
             self.log(f"Enemy list saved: {len(self.enemy_list)} enemies")
             dlg.accept()
         
@@ -1879,15 +1931,12 @@ class EditorWindow(QMainWindow):
             with zipfile.ZipFile(zip_path, 'r') as zip_file:
                 if "map.png" in zip_file.namelist():
                     map_data = zip_file.read("map.png")
-                    self.pixmap = QPixmap()
-                    self.pixmap.loadFromData(map_data)
-                    self.collision_layer = QPixmap(self.pixmap.size())
-                    self.collision_layer.fill(QColor(255,255,255,0))
+                    self.pixmap = ChunkedLayer.from_image(QImage.fromData(map_data), Qt.white)
+                    self.collision_layer = ChunkedLayer(self.pixmap.width(), self.pixmap.height(), QColor(255,255,255,0))
                 
                 if "collision.png" in zip_file.namelist():
                     collision_data = zip_file.read("collision.png")
-                    self.collision_layer = QPixmap()
-                    self.collision_layer.loadFromData(collision_data)
+                    self.collision_layer = ChunkedLayer.from_image(QImage.fromData(collision_data), QColor(255,255,255,0))
                 
                 if "map_data.json" in zip_file.namelist():
                     json_data = zip_file.read("map_data.json")
@@ -1921,12 +1970,7 @@ class EditorWindow(QMainWindow):
                 
                 actual_prefab = self._find_prefab_by_name_and_category(name, category)
                 if actual_prefab:
-                    self.prefab_objects.append({
-                        "x": prefab["x"],
-                        "y": prefab["y"],
-                        "image": actual_prefab["image"],
-                        "collision": actual_prefab["collision"]
-                    })
+                    self.prefab_objects.append(self._asset_object(actual_prefab, prefab["x"], prefab["y"]))
                 else:
                     self.log(f"Warning: Prefab '{prefab_name}' not found, using placeholder")
                     self.prefab_objects.append({
@@ -1946,12 +1990,7 @@ class EditorWindow(QMainWindow):
                 
                 actual_npc = self._find_npc_by_name_and_category(name, category)
                 if actual_npc:
-                    self.npc_objects.append({
-                        "x": npc["x"],
-                        "y": npc["y"],
-                        "image": actual_npc["image"],
-                        "collision": actual_npc["collision"]
-                    })
+                    self.npc_objects.append(self._asset_object(actual_npc, npc["x"], npc["y"]))
                 else:
                     self.log(f"Warning: NPC '{npc_name}' not found, using placeholder")
                     self.npc_objects.append({
@@ -1970,15 +2009,25 @@ class EditorWindow(QMainWindow):
             
             for spawn in data.get("spawn_areas", []):
                 self.spawn_areas.append({
-                    "x": spawn["chunk_x"] * 32,
-                    "y": spawn["chunk_y"] * 32
+                    "x": spawn["chunk_x"] * SPAWN_CHUNK_SIZE,
+                    "y": spawn["chunk_y"] * SPAWN_CHUNK_SIZE
                 })
             
             self.enemy_list = data.get("enemy_list", ["jimmy"])
+            self._reindex_objects()
+            self._update_image_pins()
+            # undo entries point at list positions from before the import
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.journal.append(self._journal_objects())
             
             self.log(f"Imported: {len(self.prefab_objects)} prefabs, {len(self.npc_objects)} NPCs, {len(self.trigger_rectangles)} triggers, {len(self.spawn_areas)} spawn areas")
             
         except Exception as e:
+            self._reindex_objects()  # the lists were already cleared/partly filled
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self.journal.append(self._journal_objects())
             self.log(f"JSON import failed: {str(e)}")
 
     def _find_prefab_by_name_and_category(self, name, category):
@@ -1998,185 +2047,2194 @@ class EditorWindow(QMainWindow):
         return None
 
     def _load_tiles(self):
-        """Load tiles from GitHub repository"""
-        self.tiles.clear()
-        
+        """Load tiles from the asset source"""
+        self._load_asset_libraries(["tiles"])
+
+    def _load_asset_libraries(self, roots):
+        """Start loading several asset folders in the background, results arrive through the asset signals"""
+        thread = threading.Thread(target=self._run_asset_loader, args=(list(roots),), name="asset-loader", daemon=True)
+        thread.start()
+
+    def _run_asset_loader(self, roots):
+        """Loader thread body, registers every asset from the manifest then warms the download cache"""
+        source = self.asset_source
         try:
-            tiles_data = self._get_github_file_list("tiles")
-            if not tiles_data:
-                self.log("No tiles found in GitHub repository")
-                return
-                
-            categories = {}
-            
-            for item in tiles_data:
-                if item['type'] == 'dir':
-                    category = item['name']
-                    categories[category] = []
-                    
-                    category_data = self._get_github_file_list(f"tiles/{category}")
-                    if category_data:
-                        for file_item in category_data:
-                            if file_item['type'] == 'file' and file_item['name'].lower().endswith('.png') and not file_item['name'].lower().endswith('_collision.png'):
-                                name = file_item['name'][:-4]
-                                
-                                image = self._load_pixmap_from_github(f"tiles/{category}/{file_item['name']}")
-                                if not image:
-                                    continue
-                                    
-                                collision = None
-                                collision_path = f"tiles/{category}/{name}_collision.png"
-                                collision = self._load_pixmap_from_github(collision_path)
-                                
-                                categories[category].append({
-                                    "name": name,
-                                    "image": image,
-                                    "collision": collision
-                                })
-            
-            uncategorized = []
-            for item in tiles_data:
-                if item['type'] == 'file' and item['name'].lower().endswith('.png') and not item['name'].lower().endswith('_collision.png'):
-                    name = item['name'][:-4]
-                    
-                    image = self._load_pixmap_from_github(f"tiles/{item['name']}")
-                    if not image:
-                        continue
-                        
-                    collision = None
-                    collision_path = f"tiles/{name}_collision.png"
-                    collision = self._load_pixmap_from_github(collision_path)
-                    
-                    uncategorized.append({
-                        "name": name,
-                        "image": image,
-                        "collision": collision
-                    })
-            
-            if uncategorized:
-                categories["Uncategorized"] = uncategorized
-            
-            self.tiles = categories
-            
-            total_tiles = sum(len(tiles) for tiles in self.tiles.values())
-            self.log(f"Loaded {total_tiles} tiles in {len(self.tiles)} categories from GitHub")
-            
-        except Exception as e:
-            self.log(f"Failed to load tiles from GitHub: {str(e)}")
+            manifest = source.manifest()
+        except (OSError, ValueError) as e:
+            # asset packs are only read here, off the GUI thread, so this is where a bad one falls back
+            self.log(f"Couldn't open {source.label} {source.source_id}: {str(e)}, using GitHub instead")
+            if self.asset_source is source:
+                self.asset_source = GitHubAssetSource(self.asset_cache, self.asset_fetcher, self.log, self._handle_network_error)
+            manifest = self.asset_source.manifest()
+        if manifest is None:
+            return
+        index = self._build_asset_index(manifest, roots)
+
+        files = []
+        for root in roots:
+            if not index[root]:
+                self.log(f"No {ASSET_LIBRARY_LABELS[root]} found in {self.asset_source.label}")
+                continue
+            self.asset_categories_listed.emit(root, list(index[root]))
+            for category, (folder_path, listing) in index[root].items():
+                assets = list(self._listing_assets(folder_path, listing))
+                self.asset_category_loaded.emit(root, category, assets)
+                for name, path, sha, collision_path, collision_sha in assets:
+                    files.append((path, sha))
+                    if collision_sha:
+                        files.append((collision_path, collision_sha))
+            self.asset_library_loaded.emit(root)
+
+        # images decode on first use, but grab the bytes now so first use doesn't wait on the network
+        if not self.asset_source.remote:
+            return
+        try:
+            pending = [self.asset_fetcher.submit(self.asset_source.prefetch, path, sha) for path, sha in files]
+            for done_count, _ in enumerate(concurrent.futures.as_completed(pending), 1):
+                self.log(f"Caching assets... {done_count}/{len(pending)}")
+        except (RuntimeError, concurrent.futures.CancelledError):
+            return  # fetch pool was shut down because the editor is closing
+        self.asset_cache.save()
+
+    def _build_asset_index(self, manifest, roots):
+        """Group manifest entries into {root: {category: (folder path, listing)}}, same shape the loader used to get per folder"""
+        index = {root: {} for root in roots}
+        for entry in sorted(manifest, key=lambda entry: entry['path']):
+            parts = entry['path'].split("/")
+            if parts[0] not in index:
+                continue
+            library = index[parts[0]]
+            if entry['type'] == 'tree' and len(parts) == 2:
+                library.setdefault(parts[1], (entry['path'], []))
+            elif entry['type'] == 'blob' and len(parts) == 3:
+                folder_path = f"{parts[0]}/{parts[1]}"
+                library.setdefault(parts[1], (folder_path, []))[1].append({"name": parts[2], "type": "file", "sha": entry['sha']})
+            elif entry['type'] == 'blob' and len(parts) == 2 and parts[0] == "tiles":
+                # only tiles allow loose images in the root folder
+                library.setdefault("Uncategorized", (parts[0], []))[1].append({"name": parts[1], "type": "file", "sha": entry['sha']})
+        if "Uncategorized" in index.get("tiles", {}):
+            index["tiles"]["Uncategorized"] = index["tiles"].pop("Uncategorized")
+        return index
+
+    def _on_asset_categories_listed(self, root, categories):
+        """Create the (still empty) categories of a library in listing order"""
+        library = getattr(self, root)
+        library.clear()
+        for category in categories:
+            library[category] = []
+        self.assets_changed.emit(root)
+
+    def _on_asset_category_loaded(self, root, category, assets):
+        """Register a category's assets as handles, nothing gets decoded until it's used"""
+        getattr(self, root)[category] = [
+            AssetHandle(name, category, path, sha, collision_path, collision_sha, self.asset_source, self.image_cache)
+            for name, path, sha, collision_path, collision_sha in assets
+        ]
+        self.assets_changed.emit(root)
+
+    def _on_asset_library_loaded(self, root):
+        library = getattr(self, root)
+        total = sum(len(assets) for assets in library.values())
+        self.log(f"Loaded {total} {ASSET_LIBRARY_LABELS[root]} in {len(library)} categories from {self.asset_source.label}")
+
+    def _on_assets_changed(self, root):
+        # the loader can land a lot of categories at once, only rebuild the model once per batch
+        if not self.stale_asset_models:
+            QTimer.singleShot(0, self._refresh_asset_models)
+        self.stale_asset_models.add(root)
+
+    def _refresh_asset_models(self):
+        for root in self.stale_asset_models:
+            self.asset_models[root].refresh()
+        self.stale_asset_models.clear()
+
+    def _listing_assets(self, folder_path, listing):
+        """Yield (name, path, sha, collision path, collision sha) for every image in a folder listing"""
+        shas = {item['name']: item['sha'] for item in listing if item['type'] == 'file'}
+        for item in listing:
+            if item['type'] == 'file' and item['name'].lower().endswith('.png') and not item['name'].lower().endswith('_collision.png'):
+                name = item['name'][:-4]
+                collision_name = f"{name}_collision.png"
+                yield name, f"{folder_path}/{item['name']}", item['sha'], f"{folder_path}/{collision_name}", shas.get(collision_name)
 
     def open_tile_stamp_dialog(self):
         pass
 
     def _place_tile_stamp(self, pos):
+        """Draw the active tile at a map position, returns the map rect that changed"""
         if not self.active_tile_stamp or not pos:
+            return None
+        if isinstance(self.active_tile_stamp, AssetHandle) and not self.active_tile_stamp.ready():
+            # evicted mid-drag, skip it rather than stamp the placeholder
+            return None
+        self.pixmap.draw_pixmap(pos[0], pos[1], self.active_tile_stamp["image"])
+        if self.active_tile_stamp["collision"]:
+            self.collision_layer.draw_pixmap(pos[0], pos[1], self.active_tile_stamp["collision"])
+        return self._tile_stamp_rect(pos)
+
+    def _preview_rect(self, image, widget_pos):
+        """Map rect a placement preview of image covers with the pointer at widget_pos, empty if there's no pointer"""
+        if widget_pos is None:
+            return QRect()
+        img_x = int(self.offset[0] + widget_pos[0] / self.zoom)
+        img_y = int(self.offset[1] + widget_pos[1] / self.zoom)
+        return QRect(img_x - image.width() // 2, img_y - image.height() // 2, image.width(), image.height())
+
+    def _move_preview(self, attr, image, pos):
+        """Move a stamp/prefab/npc preview to pos (or hide it on None), repainting only if it lands on another map pixel"""
+        old_pos = getattr(self, attr)
+        new_pos = (pos.x(), pos.y()) if pos is not None else None
+        setattr(self, attr, new_pos)
+        old_rect = self._preview_rect(image, old_pos)
+        new_rect = self._preview_rect(image, new_pos)
+        if old_rect == new_rect:
             return
-        painter = QPainter(self.pixmap)
-        painter.drawPixmap(pos[0], pos[1], self.active_tile_stamp["image"])
-        painter.end()
+        # update() coalesces, so a burst of moves still only paints once per frame
+        self.update_canvas(old_rect.united(new_rect))
+
+    def _tile_stamp_rect(self, pos):
+        """Map rect the active tile covers at pos (image and collision), empty if there's nothing there"""
+        if not self.active_tile_stamp or not pos:
+            return QRect()
+        rect = QRect(pos[0], pos[1], self.active_tile_stamp["image"].width(), self.active_tile_stamp["image"].height())
         if self.active_tile_stamp["collision"]:
-            painter = QPainter(self.collision_layer)
-            painter.drawPixmap(pos[0], pos[1], self.active_tile_stamp["collision"])
-            painter.end()
+            collision = self.active_tile_stamp["collision"]
+            rect = rect.united(QRect(pos[0], pos[1], collision.width(), collision.height()))
+        return rect
 
     def toggle_tile_editor(self):
         self.tile_editor_mode = not getattr(self, "tile_editor_mode", False)
         self.tile_editor_btn.setChecked(self.tile_editor_mode)
         if self.tile_editor_mode:
             self.palette_scroll.hide()
-            self.tile_selector = TileSelectorWidget(self.tiles, self.set_active_tile_stamp, self)
-            self.sidebar_layout.addWidget(self.tile_selector)
+            if self.tile_selector is None:
+                self.tile_selector = TileSelectorWidget(self.asset_models["tiles"], self.set_active_tile_stamp, self)
+                self.sidebar_layout.addWidget(self.tile_selector)
+            self.tile_selector.show()
             self.active_tile_stamp = None
         else:
-            if hasattr(self, "tile_selector"):
-                self.sidebar_layout.removeWidget(self.tile_selector)
-                self.tile_selector.deleteLater()
-                del self.tile_selector
+            if self.tile_selector is not None:
+                self.tile_selector.hide()
             self.palette_scroll.show()
             self.active_tile_stamp = None
         self.update_canvas()
 
     def set_active_tile_stamp(self, tile):
         self.active_tile_stamp = tile
+        if isinstance(tile, AssetHandle):
+            tile.ready()
         self.update_canvas()
 
-    def _get_github_file_list(self, folder_path):
-        """Get list of files from GitHub repository folder"""
-        try:
-            api_url = f"{GITHUB_API_BASE}/{GITHUB_REPO}/contents/{folder_path}"
-            with urllib.request.urlopen(api_url) as response:
-                data = json.loads(response.read().decode('utf-8'))
-                return data
-        except Exception as e:
-            self.log(f"Failed to get GitHub file list for {folder_path}: {str(e)}")
-            return []
+    def _on_image_ready(self, key):
+        """Swap decoded images into placed objects and previews that were showing the placeholder"""
+        waiting = [placed for placed in self.loading_objects if key in (placed["asset"].key, placed["asset"].collision_key())]
+        if waiting:
+            for placed in waiting:
+                placed["image"] = placed["asset"]["image"]
+                placed["collision"] = placed["asset"]["collision"]
+            self.loading_objects = [placed for placed in self.loading_objects if not placed["asset"].ready()]
+            # their sprite bounds were the placeholder's
+            self._reindex_objects("prefab_objects", "npc_objects")
+            self.update_canvas()
+            return
+        for asset in (self.active_stamp, self.active_prefab, self.active_npc, self.active_tile_stamp):
+            if isinstance(asset, AssetHandle) and asset.key == key:
+                self.update_canvas()
+                return
 
-    def _download_github_file(self, file_path):
-        """Download a file from GitHub repository"""
-        try:
-            raw_url = f"{GITHUB_RAW_BASE}/{GITHUB_REPO}/{GITHUB_BRANCH}/{file_path}"
-            with urllib.request.urlopen(raw_url) as response:
-                return response.read()
-        except Exception as e:
-            self.log(f"Failed to download {file_path}: {str(e)}")
-            return None
+    def _handle_network_error(self, operation, error):
+        """Handle network errors gracefully"""
+        # one line, the log bar only shows the latest message
+        self.log(f"Network error during {operation}: {str(error)}. Please check your internet connection and try again.")
 
-    def _load_pixmap_from_github(self, file_path):
-        """Load a QPixmap from GitHub repository"""
-        data = self._download_github_file(file_path)
-        if data:
-            pixmap = QPixmap()
-            pixmap.loadFromData(data)
-            return pixmap
+# one of these per asset library, the pickers and the tile sidebar all share it
+class AssetBrowserModel(QAbstractItemModel):
+    """Category -> asset tree over a library, filtered in place so views never rebuild items"""
+    def __init__(self, library, thumbnails, title):
+        super().__init__()
+        self.library = library
+        self.thumbnails = thumbnails
+        self.title = title
+        self.filter_text = ""
+        self.categories = []  # [(category, [assets])] straight from the library
+        self.search_index = []  # [(category row, asset row, lowercase "name category")]
+        self.matches = None  # search_index entries that matched filter_text
+        self.visible = []  # what the view actually sees
+        self.positions = None  # asset key -> (visible category row, row), built on demand
+        self.thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+        self.refresh()
+
+    def refresh(self):
+        """Pick up categories and assets the loader added since last time"""
+        self.beginResetModel()
+        self.categories = [(category, list(assets)) for category, assets in self.library.items()]
+        self.search_index = [
+            (category_row, asset_row, f"{asset.name}\n{category}".lower())
+            for category_row, (category, assets) in enumerate(self.categories)
+            for asset_row, asset in enumerate(assets)
+        ]
+        self.matches = None
+        self._apply_filter(self.filter_text, narrowing=False)
+        self.endResetModel()
+
+    def set_filter(self, text):
+        text = text.strip().lower()
+        if text == self.filter_text:
+            return
+        self.beginResetModel()
+        self._apply_filter(text, narrowing=bool(self.filter_text) and text.startswith(self.filter_text))
+        self.endResetModel()
+
+    def _apply_filter(self, text, narrowing):
+        if not text:
+            self.matches = None
+            self.visible = self.categories
+        else:
+            # typing another letter can only shrink the result, so only re-check the last matches
+            candidates = self.matches if narrowing and self.matches is not None else self.search_index
+            self.matches = [entry for entry in candidates if text in entry[2]]
+            grouped = OrderedDict()
+            for category_row, asset_row, _ in self.matches:
+                grouped.setdefault(category_row, []).append(self.categories[category_row][1][asset_row])
+            self.visible = [(self.categories[category_row][0], assets) for category_row, assets in grouped.items()]
+        self.filter_text = text
+        self.positions = None
+
+    def asset(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return None
+        return self.visible[index.internalId() - 1][1][index.row()]
+
+    # internal id 0 is a category row, n is an asset row under visible category n - 1
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.visible)
+        if parent.internalId() == 0:
+            return len(self.visible[parent.row()][1])
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.title
         return None
 
-    def _handle_network_error(self, operation, error):
-        """Handle network errors gracefully"""
-        self.log(f"Network error during {operation}: {str(error)}")
-        self.log("Please check your internet connection and try again.")
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if index.internalId() == 0:
+            return self.visible[index.row()][0] if role == Qt.DisplayRole else None
+        asset = self.asset(index)
+        if role == Qt.DisplayRole:
+            return asset.name
+        if role == Qt.DecorationRole:
+            # the view only asks for rows it's painting, so offscreen thumbnails never get made
+            return self.thumbnails.icon(asset)
+        if role == Qt.UserRole:
+            return asset
+        return None
 
-class TileSelectorWidget(QWidget):
-    def __init__(self, tiles, select_callback, parent=None):
+    def _on_thumbnail_ready(self, key):
+        if self.positions is None:
+            self.positions = {
+                asset.key: (category_row, asset_row)
+                for category_row, (_, assets) in enumerate(self.visible)
+                for asset_row, asset in enumerate(assets)
+            }
+        position = self.positions.get(key)
+        if position is not None:
+            index = self.createIndex(position[1], 0, position[0] + 1)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+# search box + tree, cheap to make since all the items live in the model
+class AssetBrowserWidget(QWidget):
+    asset_clicked = pyqtSignal(object)
+    asset_activated = pyqtSignal(object)
+
+    def __init__(self, model, expand_all, parent=None):
         super().__init__(parent)
-        self.tiles = tiles
-        self.select_callback = select_callback
+        self.model = model
+        self.expand_all = expand_all
         layout = QVBoxLayout()
         self.setLayout(layout)
 
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabel("Tile Categories")
-        self.tree.setIconSize(QSize(32, 32))
-        layout.addWidget(self.tree)
-
-        for category, tiles in self.tiles.items():
-            category_item = QTreeWidgetItem([category])
-            category_item.setExpanded(False)
-            self.tree.addTopLevelItem(category_item)
-            for tile in tiles:
-                tile_item = QTreeWidgetItem([tile["name"]])
-                icon = QIcon(tile["image"])
-                tile_item.setIcon(0, icon)
-                tile_item.setData(0, Qt.ItemDataRole.UserRole, tile)
-                category_item.addChild(tile_item)
-
-        self.tree.itemClicked.connect(self._on_item_clicked)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search...")
+        self.search.setText(model.filter_text)
+        self.search.textChanged.connect(model.set_filter)
+        layout.addWidget(self.search)
+
+        self.view = QTreeView()
+        self.view.setModel(model)
+        self.view.setUniformRowHeights(True)  # lets the view skip measuring every row
+        self.view.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.view.clicked.connect(lambda index: self._emit_asset(self.asset_clicked, index))
+        self.view.activated.connect(lambda index: self._emit_asset(self.asset_activated, index))
+        layout.addWidget(self.view)
+
+        # the loader and the search box reset the model, which collapses every category
+        self.expanded = set()  # categories the user had open, by name
+        model.modelAboutToBeReset.connect(self._remember_expanded)
+        model.modelReset.connect(self._expand)
+        self._expand()
+
+    def _emit_asset(self, signal, index):
+        asset = self.model.asset(index)
+        if asset is not None:
+            signal.emit(asset)
+
+    def _remember_expanded(self):
+        # a search expands everything, keep what was open before it instead
+        if self.expand_all or self.model.filter_text:
+            return
+        self.expanded = {
+            category for row, (category, _) in enumerate(self.model.visible)
+            if self.view.isExpanded(self.model.index(row, 0))
+        }
 
-    def _on_item_clicked(self, item, col):
-        if item.parent():
-            self.select_callback(item.data(0, Qt.ItemDataRole.UserRole))
+    def _expand(self):
+        if self.expand_all or self.model.filter_text:
+            self.view.expandAll()
+            return
+        for row, (category, _) in enumerate(self.model.visible):
+            if category in self.expanded:
+                self.view.expand(self.model.index(row, 0))
+
+    def selected_asset(self):
+        return self.model.asset(self.view.currentIndex())
+
+    def detach(self):
+        """Stop following the shared model, for browsers that go away before it does"""
+        self.model.modelAboutToBeReset.disconnect(self._remember_expanded)
+        self.model.modelReset.disconnect(self._expand)
+        self.search.textChanged.disconnect(self.model.set_filter)
+
+class TileSelectorWidget(AssetBrowserWidget):
+    def __init__(self, model, select_callback, parent=None):
+        super().__init__(model, expand_all=False, parent=parent)
+        self.select_callback = select_callback
+        self.asset_clicked.connect(self.select_callback)
 
     def _close_tile_editor(self):
         parent = self.parent()
         if parent and hasattr(parent, 'toggle_tile_editor'):
             parent.toggle_tile_editor()
 
+# buckets placed things by map area so drawing doesn't have to walk every object on the map
+class SpatialIndex:
+    """Uniform grid of list positions, so results come back in list (draw) order"""
+    def __init__(self, cell_size, bounds):
+        self.cell_size = cell_size
+        self.bounds = bounds  # item -> (x1, y1, x2, y2) in map pixels
+        self.cells = {}
+        self.extent = None  # (min cell x, min cell y, max cell x, max cell y) of anything indexed
+
+    def rebuild(self, items):
+        self.cells = {}
+        self.extent = None
+        for position, item in enumerate(items):
+            self.add(position, item)
+
+    def _cell_range(self, x1, y1, x2, y2):
+        size = self.cell_size
+        return int(x1 // size), int(y1 // size), int(x2 // size), int(y2 // size)
+
+    def add(self, position, item):
+        cx1, cy1, cx2, cy2 = self._cell_range(*self.bounds(item))
+        for cy in range(cy1, cy2 + 1):
+            for cx in range(cx1, cx2 + 1):
+                self.cells.setdefault((cx, cy), []).append(position)
+        if self.extent is None:
+            self.extent = (cx1, cy1, cx2, cy2)
+        else:
+            ex1, ey1, ex2, ey2 = self.extent
+            self.extent = (min(ex1, cx1), min(ey1, cy1), max(ex2, cx2), max(ey2, cy2))
+
+    def query(self, x1, y1, x2, y2):
+        """Sorted positions of items whose cells touch the rect, callers still do the exact test"""
+        if self.extent is None:
+            return []
+        cx1, cy1, cx2, cy2 = self._cell_range(x1, y1, x2, y2)
+        ex1, ey1, ex2, ey2 = self.extent
+        found = set()
+        for cy in range(max(cy1, ey1), min(cy2, ey2) + 1):
+            for cx in range(max(cx1, ex1), min(cx2, ex2) + 1):
+                found.update(self.cells.get((cx, cy), ()))
+        return sorted(found)
+
+# the map is cut into square chunks that only get allocated once something is drawn on them
+class ChunkedLayer:
+    """Sparse grid of QImage chunks standing in for one huge map-sized QPixmap"""
+    def __init__(self, width, height, fill, chunk_size=None):
+        self.w = width
+        self.h = height
+        self.fill = QColor(fill)
+        self.chunk_size = chunk_size or MAP_CHUNK_SIZE
+        self.chunks = {}  # (chunk x, chunk y) -> QImage, a missing chunk is just the fill colour
+        self.blank = None  # one fill-coloured chunk that every missing one is drawn with
+        self.levels = {}  # (level, x, y) -> downscaled QImage covering 2**level x 2**level chunks, None if all fill
+        self.watchers = []  # CompositeLayers built from this one, told whenever a chunk gets painted on
+        self.recording = None  # LayerDelta of the undo entry in progress, told about every chunk area before it's painted on
+
+    @classmethod
+    def from_image(cls, image, fill):
+        """Cut an image into chunks, leaving out the ones that are nothing but fill"""
+        layer = cls(image.width(), image.height(), fill)
+        image = image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+        blank = None
+        for cy in range(math.ceil(layer.h / layer.chunk_size)):
+            for cx in range(math.ceil(layer.w / layer.chunk_size)):
+                chunk = image.copy(layer.chunk_rect(cx, cy))
+                if blank is None or blank.size() != chunk.size():
+                    blank = QImage(chunk.size(), QImage.Format_ARGB32_Premultiplied)
+                    blank.fill(layer.fill)
+                if chunk != blank:
+                    layer.chunks[(cx, cy)] = chunk
+        return layer
+
+    def width(self):
+        return self.w
+
+    def height(self):
+        return self.h
+
+    def size(self):
+        return QSize(self.w, self.h)
+
+    def rect(self):
+        return QRect(0, 0, self.w, self.h)
+
+    def isNull(self):
+        return self.w <= 0 or self.h <= 0
+
+    def __bool__(self):
+        return not self.isNull()
+
+    def chunk_rect(self, cx, cy):
+        """Map rect covered by a chunk, the ones on the right/bottom edge are cut to the map size"""
+        size = self.chunk_size
+        return QRect(cx * size, cy * size, min(size, self.w - cx * size), min(size, self.h - cy * size))
+
+    def chunk_keys(self, rect):
+        """Chunks overlapping a map rect (clipped to the map), allocated or not"""
+        rect = QRect(rect).intersected(self.rect())
+        if rect.isEmpty():
+            return []
+        size = self.chunk_size
+        return [
+            (cx, cy)
+            for cy in range(rect.top() // size, rect.bottom() // size + 1)
+            for cx in range(rect.left() // size, rect.right() // size + 1)
+        ]
+
+    def chunk(self, key):
+        """Image of one chunk, None if it was never drawn on"""
+        return self.chunks.get(key)
+
+    def swap_chunks(self, chunks):
+        """Put saved chunk areas back (see LayerDelta.chunks), returns what was there before in the same form"""
+        previous = {}
+        for key, (image, rect) in chunks.items():
+            self._drop_levels(key)
+            for watcher in self.watchers:
+                watcher.invalidate_chunk(key)
+            chunk = self.chunks.get(key)
+            if image is None:
+                # there was no chunk at all, so the whole current one goes
+                if chunk is None:
+                    previous[key] = (None, rect)
+                else:
+                    previous[key] = (chunk, chunk.rect())
+                    del self.chunks[key]
+                continue
+            if chunk is None:
+                previous[key] = (None, rect)
+                full = self.chunk_rect(*key)
+                chunk = self.chunks[key] = QImage(full.width(), full.height(), QImage.Format_ARGB32_Premultiplied)
+                chunk.fill(self.fill)
+            else:
+                previous[key] = (chunk.copy(rect), rect)
+            painter = QPainter(chunk)
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            painter.drawImage(rect.topLeft(), image)
+            painter.end()
+        return previous
+
+    def nbytes(self, shared_with=None):
+        """Memory held by the chunks, leaving out ones still shared (copy-on-write) with the same chunk of shared_with"""
+        total = 0
+        for key, chunk in self.chunks.items():
+            other = shared_with.chunks.get(key) if shared_with is not None else None
+            if other is None or other.cacheKey() != chunk.cacheKey():
+                total += chunk.sizeInBytes()
+        return total
+
+    def _drop_levels(self, key):
+        # whatever changes in a chunk makes the zoomed out images above it stale
+        for level in range(1, self.max_level() + 1):
+            self.levels.pop((level, key[0] >> level, key[1] >> level), None)
+
+    def _writable_chunk(self, key, rect=None):
+        self._drop_levels(key)
+        for watcher in self.watchers:
+            watcher.invalidate_chunk(key)
+        chunk = self.chunks.get(key)
+        if self.recording is not None:
+            self.recording.note(key, chunk, rect)
+        if chunk is None:
+            rect = self.chunk_rect(*key)
+            chunk = QImage(rect.width(), rect.height(), QImage.Format_ARGB32_Premultiplied)
+            chunk.fill(self.fill)
+            self.chunks[key] = chunk
+        return chunk
+
+    def paint(self, rect, draw):
+        """Call draw(painter) in map coordinates on each chunk that rect (the area draw touches) overlaps"""
+        for key in self.chunk_keys(rect):
+            chunk_rect = self.chunk_rect(*key)
+            local = QRect(rect).intersected(chunk_rect).translated(-chunk_rect.x(), -chunk_rect.y())
+            painter = QPainter(self._writable_chunk(key, local))
+            painter.translate(-key[0] * self.chunk_size, -key[1] * self.chunk_size)
+            draw(painter)
+            painter.end()
+
+    def draw_pixmap(self, x, y, pixmap):
+        self.paint(QRect(x, y, pixmap.width(), pixmap.height()), lambda painter: painter.drawPixmap(x, y, pixmap))
+
+    def render(self, painter, target_rect, source_rect):
+        """Same as painter.drawPixmap(target_rect, layer, source_rect) would be for a plain pixmap"""
+        scale_x = target_rect.width() / source_rect.width()
+        scale_y = target_rect.height() / source_rect.height()
+        painter.save()
+        painter.setClipRect(target_rect, Qt.IntersectClip)
+        painter.translate(target_rect.x() - source_rect.x() * scale_x, target_rect.y() - source_rect.y() * scale_y)
+        painter.scale(scale_x, scale_y)
+        # only walk the chunks under the painter's clip, which is just the dirty part on partial redraws
+        visible = painter.clipBoundingRect().intersected(source_rect).intersected(QRectF(self.rect()))
+        if visible.isEmpty():
+            painter.restore()
+            return
+        level = self.level_for_scale(min(scale_x, scale_y))
+        if level:
+            self._render_level(painter, level, visible.toAlignedRect())
+            painter.restore()
+            return
+        for key in self.chunk_keys(visible.toAlignedRect()):
+            chunk = self.chunk(key)
+            if chunk is not None:
+                painter.drawImage(self.chunk_rect(*key).topLeft(), chunk)
+            elif self.fill.alpha():
+                # drawImage and not fillRect, so opacity rounds the same as on real chunks
+                rect = self.chunk_rect(*key)
+                painter.drawImage(rect.topLeft(), self._blank_chunk(), QRect(0, 0, rect.width(), rect.height()))
+        painter.restore()
+
+    def max_level(self):
+        """Level at which a single image covers the whole map"""
+        level = 0
+        while (self.chunk_size << level) < max(self.w, self.h):
+            level += 1
+        return level
+
+    def level_for_scale(self, scale):
+        """Coarsest level that still has at least one pixel per screen pixel at this scale, 0 is the chunks themselves"""
+        if scale <= 0 or scale > 0.5:
+            return 0
+        return min(int(math.log2(1 / scale)), self.max_level())
+
+    def level_rect(self, level, x, y):
+        """Map rect covered by one image of a level, cut to the map size like chunk_rect"""
+        span = self.chunk_size << level
+        return QRect(x * span, y * span, min(span, self.w - x * span), min(span, self.h - y * span))
+
+    def level_image(self, level, x, y):
+        """Downscaled image of a level (built from the four below it on first use), None if it's nothing but fill"""
+        if level == 0:
+            return self.chunk((x, y))
+        key = (level, x, y)
+        if key in self.levels:
+            return self.levels[key]
+        rect = self.level_rect(level, x, y)
+        children = []
+        for cy in (y * 2, y * 2 + 1):
+            for cx in (x * 2, x * 2 + 1):
+                child_rect = self.level_rect(level - 1, cx, cy)
+                if child_rect.width() > 0 and child_rect.height() > 0:
+                    child = self.level_image(level - 1, cx, cy)
+                    if child is not None:
+                        children.append((child_rect, child))
+        image = None
+        if children:
+            step = 1 << level
+            image = QImage(-(-rect.width() // step), -(-rect.height() // step), QImage.Format_ARGB32_Premultiplied)
+            image.fill(self.fill)
+            painter = QPainter(image)
+            painter.setCompositionMode(QPainter.CompositionMode_Source)
+            # an exact 2x bilinear shrink averages each 2x2 block
+            painter.setRenderHint(QPainter.SmoothPixmapTransform)
+            # exactly 1/step even when the map size isn't a multiple of it, the last row/column is then partly unused
+            painter.scale(1 / step, 1 / step)
+            painter.translate(-rect.x(), -rect.y())
+            for child_rect, child in children:
+                painter.drawImage(QRectF(child_rect), child)
+            painter.end()
+        self.levels[key] = image
+        return image
+
+    def _render_level(self, painter, level, visible):
+        """render() for zoomed out views, one downscaled image per 2**level x 2**level chunks instead of every chunk"""
+        span = self.chunk_size << level
+        for y in range(visible.top() // span, visible.bottom() // span + 1):
+            for x in range(visible.left() // span, visible.right() // span + 1):
+                rect = self.level_rect(level, x, y)
+                image = self.level_image(level, x, y)
+                if image is not None:
+                    painter.drawImage(QRectF(rect), image, QRectF(0, 0, rect.width() / (1 << level), rect.height() / (1 << level)))
+                elif self.fill.alpha():
+                    painter.drawImage(QRectF(rect), self._blank_chunk())
+
+    def _blank_chunk(self):
+        if self.blank is None:
+            self.blank = QImage(self.chunk_size, self.chunk_size, QImage.Format_ARGB32_Premultiplied)
+            self.blank.fill(self.fill)
+        return self.blank
+
+    def resized(self, width, height):
+        """New layer with this one's content in the top left corner, new area gets the fill colour"""
+        layer = ChunkedLayer(width, height, self.fill, self.chunk_size)
+        for key, chunk in self.chunks.items():
+            rect = layer.chunk_rect(*key)
+            if rect.width() <= 0 or rect.height() <= 0:
+                continue
+            if rect.size() == chunk.size():
+                layer.chunks[key] = QImage(chunk)
+            else:
+                painter = QPainter(layer._writable_chunk(key))
+                painter.drawImage(0, 0, chunk)
+                painter.end()
+        return layer
+
+    def to_image(self):
+        """Flatten into one full-size image, only for saving/exporting"""
+        image = QImage(self.w, self.h, QImage.Format_ARGB32_Premultiplied)
+        image.fill(self.fill)
+        painter = QPainter(image)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        for key, chunk in self.chunks.items():
+            painter.drawImage(self.chunk_rect(*key).topLeft(), chunk)
+        painter.end()
+        return image
+
+# collision mode fades the map under the collision layer, this keeps that blend around per chunk instead of redoing it every frame
+class CompositeLayer(ChunkedLayer):
+    """Chunks blended from other layers on first use, dropped again when a source chunk is painted on"""
+    def __init__(self, sources, compose):
+        first = sources[0]
+        super().__init__(first.width(), first.height(), QColor(0, 0, 0, 0), first.chunk_size)
+        self.sources = sources
+        self.compose = compose  # compose(painter, rect) draws the blend of a map rect, in map coordinates
+        self.chunks = OrderedDict()  # least recently drawn first, so the oldest can go once there are too many
+        for source in sources:
+            source.watchers.append(self)
+
+    def detach(self):
+        """Stop listening to the sources, for when the layers are swapped out and this gets thrown away"""
+        for source in self.sources:
+            if self in source.watchers:
+                source.watchers.remove(self)
+
+    def chunk(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+        rect = self.chunk_rect(*key)
+        chunk = QImage(rect.width(), rect.height(), QImage.Format_ARGB32_Premultiplied)
+        chunk.fill(self.fill)
+        painter = QPainter(chunk)
+        painter.translate(-rect.x(), -rect.y())
+        self.compose(painter, rect)
+        painter.end()
+        self.chunks[key] = chunk
+        while len(self.chunks) > COMPOSITE_CACHE_CHUNKS:
+            self.chunks.popitem(last=False)
+        return chunk
+
+    def invalidate_chunk(self, key):
+        self.chunks.pop(key, None)
+        self._drop_levels(key)
+
+    def invalidate(self, rect):
+        """Rebuild everything under a map rect next time it's drawn"""
+        for key in self.chunk_keys(rect):
+            self.invalidate_chunk(key)
+
+# one of these per brush drag, the chunks it touches keep a painter open until the mouse comes back up
+class StrokeSession:
+    """Brush stroke on a layer, each new sample is joined to the last one so fast drags don't leave gaps"""
+    def __init__(self, layer, brush_size, color, clear=False):
+        self.layer = layer
+        self.brush_size = brush_size
+        self.color = color
+        self.clear = clear  # erase to transparent instead of painting color
+        self.painters = {}  # chunk key -> QPainter open on that chunk
+        self.last = None  # map pixel of the previous sample
+        self.dirty = QRect()  # everything the stroke has changed so far, in map pixels
+
+    def _painter(self, key, local):
+        # the layer still has to hear about every area, that's what the undo entry and the caches go by
+        chunk = self.layer._writable_chunk(key, local)
+        painter = self.painters.get(key)
+        if painter is None:
+            painter = self.painters[key] = QPainter(chunk)
+            painter.translate(-key[0] * self.layer.chunk_size, -key[1] * self.layer.chunk_size)
+            if self.clear:
+                painter.setCompositionMode(QPainter.CompositionMode_Clear)
+            if self.brush_size == 1:
+                painter.setPen(self.color)
+            else:
+                painter.setPen(Qt.NoPen)
+                painter.setBrush(self.color)
+        return painter
+
+    def _shape(self, x1, y1, x2, y2):
+        """The brush square swept from one sample to the next, same pixels a single dab used to cover when they're equal"""
+        # drawRect with the pen outline was one pixel bigger than the brush
+        a = self.brush_size + 1
+        if x2 >= x1 and y2 >= y1:
+            points = [(x1, y1), (x1 + a, y1), (x2 + a, y2), (x2 + a, y2 + a), (x2, y2 + a), (x1, y1 + a)]
+        elif x2 >= x1:
+            points = [(x1, y1), (x2, y2), (x2 + a, y2), (x2 + a, y2 + a), (x1 + a, y1 + a), (x1, y1 + a)]
+        elif y2 >= y1:
+            points = [(x1, y1), (x1 + a, y1), (x1 + a, y1 + a), (x2 + a, y2 + a), (x2, y2 + a), (x2, y2)]
+        else:
+            points = [(x2, y2), (x2 + a, y2), (x1 + a, y1), (x1 + a, y1 + a), (x1, y1 + a), (x2, y2 + a)]
+        return QPolygon([coordinate for point in points for coordinate in point])
+
+    def add(self, x, y):
+        """Paint from the previous sample to this map pixel, returns the map rect that changed"""
+        x1, y1 = self.last if self.last is not None else (x, y)
+        self.last = (x, y)
+        # this runs on every mouse move, so the chunk walk is plain ints instead of chunk_keys and QRects
+        reach = 0 if self.brush_size == 1 else self.brush_size
+        left, top = max(min(x1, x), 0), max(min(y1, y), 0)
+        right, bottom = min(max(x1, x) + reach, self.layer.w - 1), min(max(y1, y) + reach, self.layer.h - 1)
+        if left > right or top > bottom:
+            return QRect()
+        shape = None if self.brush_size == 1 else self._shape(x1, y1, x, y)
+        size = self.layer.chunk_size
+        for cy in range(top // size, bottom // size + 1):
+            oy = cy * size
+            for cx in range(left // size, right // size + 1):
+                ox = cx * size
+                local = QRect(QPoint(max(left, ox) - ox, max(top, oy) - oy), QPoint(min(right, ox + size - 1) - ox, min(bottom, oy + size - 1) - oy))
+                painter = self._painter((cx, cy), local)
+                if shape is not None:
+                    painter.drawPolygon(shape)
+                elif (x1, y1) == (x, y):
+                    painter.drawPoint(x, y)
+                else:
+                    painter.drawLine(x1, y1, x, y)
+        rect = QRect(QPoint(left, top), QPoint(right, bottom))
+        self.dirty = self.dirty.united(rect)
+        return rect
+
+    def end(self):
+        """Close the painters, returns everything the stroke changed"""
+        for painter in self.painters.values():
+            painter.end()
+        self.painters = {}
+        return self.dirty
+
+# undo keeps the chunks a stroke touched instead of a copy of the whole layer
+class LayerDelta:
+    """Undo entry for one map layer, the layer it was made on and the old contents of the areas that changed"""
+    def __init__(self, layer, chunks=None):
+        self.layer = layer
+        # (chunk x, chunk y) -> (old pixels of rect or None if there was no chunk, rect in chunk pixels)
+        self.chunks = {} if chunks is None else chunks
+        self.packed = False  # UndoHistory swaps the images for PackedImages once the entry isn't among the newest
+
+    def note(self, key, chunk, rect):
+        """Called by the layer before it paints on rect (chunk pixels, None for all of it) of a chunk"""
+        if rect is None:
+            rect = QRect(0, 0, self.layer.chunk_size, self.layer.chunk_size)
+        if key in self.chunks:
+            image, changed = self.chunks[key]
+            self.chunks[key] = (image, changed.united(rect))
+        else:
+            # copy-on-write, the painting that follows detaches the layer's chunk and leaves this one as it was
+            self.chunks[key] = (QImage(chunk) if chunk is not None else None, rect)
+
+    def compact(self):
+        """Once nothing more gets recorded, keep only the changed rect of each saved chunk instead of all of it"""
+        for key, (image, rect) in self.chunks.items():
+            if image is not None and image.size() != rect.size():
+                rect = rect.intersected(image.rect())
+                self.chunks[key] = (image.copy(rect), rect)
+
+    def nbytes(self):
+        if self.packed:
+            return sum(packed.nbytes() for packed, _ in self.chunks.values() if packed is not None)
+        return sum(image.sizeInBytes() for image, _ in self.chunks.values() if image is not None)
+
+    def unpack(self):
+        self.chunks = {key: (packed.image() if packed is not None else None, rect) for key, (packed, rect) in self.chunks.items()}
+        self.packed = False
+
+    def restore(self):
+        """Put the old chunks back on the layer, returns the delta that puts the current ones back"""
+        return LayerDelta(self.layer, self.layer.swap_chunks(self.chunks))
+
+# undo for placed things holds the one object that changed instead of a copy of the whole list
+class ObjectEdit:
+    """One object list change: before None adds after at position, after None removes before, both replaces it"""
+    def __init__(self, name, position, before, after):
+        self.name = name
+        self.position = position
+        self.before = before
+        self.after = after
+
+    def apply(self, objects):
+        """Make the change on the list, returns the edit that reverses it"""
+        if self.before is None:
+            objects.insert(self.position, self.after)
+        elif self.after is None:
+            objects.pop(self.position)
+        else:
+            objects[self.position] = self.after
+        return self.reversed()
+
+    def reversed(self):
+        return ObjectEdit(self.name, self.position, self.after, self.before)
+
+# older undo images are kept zlib-compressed, and in a temp file once there are too many of them for memory
+class PackedImage:
+    """A QImage as compressed pixels, in memory until spilled to a SpillFile"""
+    def __init__(self, image):
+        # runs on the undo worker thread, zlib lets go of the GIL while it works
+        self.width = image.width()
+        self.height = image.height()
+        self.format = image.format()
+        self.bytes_per_line = image.bytesPerLine()
+        bits = image.constBits()
+        bits.setsize(image.sizeInBytes())
+        self.data = zlib.compress(bytes(bits), UNDO_COMPRESS_LEVEL)
+        self.length = len(self.data)
+        self.spill = None
+        self.offset = 0
+
+    def nbytes(self):
+        """Memory used, nothing once it's on disk"""
+        return self.length if self.data is not None else 0
+
+    def image(self):
+        data = self.data if self.data is not None else self.spill.read(self)
+        pixels = zlib.decompress(data)
+        # QImage doesn't copy a buffer it's given, so copy before pixels goes away
+        return QImage(pixels, self.width, self.height, self.bytes_per_line, self.format).copy()
+
+class SpillFile:
+    """Append-only temp file holding PackedImages that didn't fit the undo memory budget"""
+    def __init__(self):
+        self.file = tempfile.TemporaryFile(prefix="father-undo-")
+        self.end = 0
+        self.live = 0  # bytes still used by some entry, the rest is waiting for compact()
+        self.blobs = set()
+
+    def write(self, packed):
+        self.file.seek(self.end)
+        self.file.write(packed.data)
+        packed.offset = self.end
+        packed.spill = self
+        packed.data = None
+        self.end += packed.length
+        self.live += packed.length
+        self.blobs.add(packed)
+
+    def read(self, packed):
+        self.file.seek(packed.offset)
+        return self.file.read(packed.length)
+
+    def free(self, packed):
+        if packed in self.blobs:
+            self.blobs.discard(packed)
+            self.live -= packed.length
+
+    def compact(self):
+        """Rewrite the file without dropped entries once they're most of it"""
+        if self.end - self.live < max(self.live, UNDO_SPILL_COMPACT_BYTES):
+            return
+        old = self.file
+        self.file = tempfile.TemporaryFile(prefix="father-undo-")
+        self.end = 0
+        for packed in sorted(self.blobs, key=lambda blob: blob.offset):
+            old.seek(packed.offset)
+            self.file.write(old.read(packed.length))
+            packed.offset = self.end
+            self.end += packed.length
+        old.close()
+
+    def close(self):
+        self.file.close()
+
+# undo/redo stack that packs older entries away and forgets the oldest once both budgets are used up
+class UndoHistory(QObject):
+    """Entries newest last. All but the newest hot_entries get their layer deltas compressed on a worker thread,
+    past memory_bytes the oldest packed ones move to a temp file and past disk_bytes the oldest entries are dropped"""
+    _packed = pyqtSignal(object, object)
+
+    def __init__(self, memory_bytes, disk_bytes, hot_entries, layer_bytes):
+        super().__init__()
+        self.entries = deque()
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.hot_entries = max(1, hot_entries)
+        self.layer_bytes = layer_bytes  # entry -> memory held by whole old layers it keeps alive, those can't be packed
+        self.pending = {}  # LayerDelta -> future packing it
+        self.spill = None  # made the first time something has to go to disk
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="undo-pack")
+        self._packed.connect(self._on_packed)
+
+    def append(self, entry):
+        self.entries.append(entry)
+        self._pack_entries(list(self.entries)[:-self.hot_entries])
+        self.trim()
+
+    def _pack_entries(self, entries):
+        for entry in entries:
+            for delta in self._deltas(entry):
+                if not delta.packed and delta not in self.pending and delta.chunks:
+                    # the worker gets its own references, the entry keeps its images until the packed ones come back
+                    images = {key: (QImage(image) if image is not None else None, rect) for key, (image, rect) in delta.chunks.items()}
+                    self.pending[delta] = self.pool.submit(self._pack, delta, images)
+
+    def pop(self):
+        """Newest entry with everything unpacked again, ready for _restore_state"""
+        entry = self.entries.pop()
+        for delta in self._deltas(entry):
+            future = self.pending.pop(delta, None)
+            if future is not None:
+                future.cancel()
+            if delta.packed:
+                self._free(delta)
+                delta.unpack()
+        return entry
+
+    def clear(self):
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.entries.clear()
+        if self.spill is not None:
+            self.spill.close()
+            self.spill = None
+
+    def _pack(self, delta, images):
+        packed = {key: (PackedImage(image) if image is not None else None, rect) for key, (image, rect) in images.items()}
+        self._packed.emit(delta, packed)
+
+    def _on_packed(self, delta, packed):
+        if self.pending.pop(delta, None) is None:
+            return  # undone or dropped while it was being packed
+        delta.chunks = packed
+        delta.packed = True
+        self.trim()
+
+    def _deltas(self, entry):
+        return [saved for saved in entry.values() if isinstance(saved, LayerDelta)]
+
+    def _memory(self, entry):
+        return sum(delta.nbytes() for delta in self._deltas(entry)) + self.layer_bytes(entry)
+
+    def _free(self, delta):
+        if delta.packed and self.spill is not None:
+            for packed, _ in delta.chunks.values():
+                if packed is not None:
+                    self.spill.free(packed)
+
+    def trim(self):
+        """Spill the oldest packed entries until memory fits and drop the oldest entries until disk fits, spilled
+        entries only ever count against disk_bytes"""
+        memory = sum(self._memory(entry) for entry in self.entries)
+        for entry in self.entries:
+            if memory <= self.memory_bytes:
+                break
+            for delta in self._deltas(entry):
+                if delta.packed:
+                    memory -= delta.nbytes()
+                    if self.spill is None:
+                        self.spill = SpillFile()
+                    for packed, _ in delta.chunks.values():
+                        if packed is not None and packed.data is not None:
+                            self.spill.write(packed)
+        if memory > self.memory_bytes and not self.pending:
+            # still too much, so the hot entries get packed too, all but the newest which may still be recording
+            self._pack_entries(list(self.entries)[:-1])
+        if memory > self.memory_bytes and not self.pending:
+            # what's left can't be packed (whole layers kept by resizes, the newest entry), forgetting the oldest
+            # entries only helps up to the last one that holds any of it, spilled ones cost nothing here
+            holding = [position for position, entry in enumerate(list(self.entries)[:-1]) if self._memory(entry)]
+            for _ in range(holding[-1] + 1 if holding else 0):
+                if memory <= self.memory_bytes:
+                    break
+                memory -= self._drop_oldest()
+        # the newest entry always stays, however big it is
+        while len(self.entries) > 1 and self.spill is not None and self.spill.live > self.disk_bytes:
+            self._drop_oldest()
+        if self.spill is not None:
+            self.spill.compact()
+
+    def _drop_oldest(self):
+        """Forget the oldest entry, returns the memory it held"""
+        entry = self.entries.popleft()
+        memory = self._memory(entry)
+        for delta in self._deltas(entry):
+            future = self.pending.pop(delta, None)
+            if future is not None:
+                future.cancel()
+            self._free(delta)
+        return memory
+
+    def shutdown(self):
+        self.clear()
+        self.pool.shutdown(wait=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __reversed__(self):
+        return reversed(self.entries)
+
+# hangs off a ChunkedLayer like a CompositeLayer does, but just remembers which chunks were painted on
+class DirtyChunks:
+    def __init__(self):
+        self.keys = set()
+
+    def invalidate_chunk(self, key):
+        self.keys.add(key)
+
+# crash insurance, everything that changes the map since the last checkpoint gets appended here by a background thread
+class EditJournal:
+    """Append-only file of map edits on top of a checkpoint of the whole map, read back with replay() after a crash"""
+    def __init__(self, path):
+        self.path = path
+        self.file = None  # only touched by the worker once open() is done
+        self.layers = {}  # layer name -> (ChunkedLayer being followed, DirtyChunks it fills in)
+        self.records = []  # (header, image or None) appended since the last flush
+        self.size = 0  # bytes in the file and at the end of the last checkpoint, kept by the worker
+        self.checkpoint_size = 0
+        self.error = None  # last write failure, reported by the editor
+        self.checkpointing = None  # future of the checkpoint being written
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+
+    @staticmethod
+    def _encode(header, image):
+        """Record bytes: lengths and crc of the rest, JSON header, zlib'd chunk pixels if there are any"""
+        data = b""
+        if image is not None:
+            header = dict(header, width=image.width(), height=image.height(), format=int(image.format()), bpl=image.bytesPerLine())
+            bits = image.constBits()
+            bits.setsize(image.sizeInBytes())
+            data = zlib.compress(bytes(bits), JOURNAL_COMPRESS_LEVEL)
+        head = json.dumps(header).encode("utf-8")
+        return struct.pack("<III", len(head), len(data), zlib.crc32(head + data)) + head + data
+
+    @staticmethod
+    def replay(path, images=True):
+        """(header, chunk QImage or None) for every record, stopping at the first one a crash cut short"""
+        with open(path, "rb") as f:
+            while True:
+                prefix = f.read(12)
+                if len(prefix) < 12:
+                    return
+                head_length, data_length, crc = struct.unpack("<III", prefix)
+                head = f.read(head_length)
+                data = f.read(data_length)
+                if len(head) < head_length or len(data) < data_length or zlib.crc32(head + data) != crc:
+                    return
+                header = json.loads(head.decode("utf-8"))
+                image = None
+                if data and images:
+                    image = QImage(zlib.decompress(data), header["width"], header["height"], header["bpl"], QImage.Format(header["format"])).copy()
+                yield header, image
+
+    @staticmethod
+    def has_edits(path):
+        """False for a journal still holding only the map its editor started with, there's nothing in it to recover"""
+        in_checkpoint = True
+        for header, _ in EditJournal.replay(path, images=False):
+            # the file starts with a checkpoint, layer and chunk records closed by its objects record
+            if in_checkpoint:
+                if header["op"] == "objects":
+                    if not header.get("startup"):
+                        return True
+                    in_checkpoint = False
+                continue
+            return True
+        return False
+
+    def _layer_records(self, name, layer):
+        records = [({"op": "layer", "layer": name, "width": layer.width(), "height": layer.height(), "fill": layer.fill.rgba(), "chunk_size": layer.chunk_size}, None)]
+        # QImage copies are copy-on-write, the worker gets the pixels as they are now without anything being duplicated here
+        records.extend(({"op": "chunk", "layer": name, "key": list(key)}, QImage(chunk)) for key, chunk in layer.chunks.items())
+        return records
+
+    def _follow(self, name, layer):
+        old = self.layers.get(name)
+        if old is not None and old[1] in old[0].watchers:
+            old[0].watchers.remove(old[1])
+        dirty = DirtyChunks()
+        layer.watchers.append(dirty)
+        self.layers[name] = (layer, dirty)
+
+    def append(self, header):
+        """Queue a non-layer edit (objects, enemy list), written with the next flush"""
+        self.records.append((header, None))
+
+    def flush(self, layers):
+        """Hand everything since the last flush to the worker, layers is name -> the ChunkedLayer in use now"""
+        records = []
+        for name, layer in layers.items():
+            followed = self.layers.get(name)
+            if followed is None or followed[0] is not layer:
+                # resized, opened, imported or undone to another layer, so write all of it
+                self._follow(name, layer)
+                records.extend(self._layer_records(name, layer))
+                continue
+            dirty = followed[1]
+            for key in dirty.keys:
+                chunk = layer.chunk(key)
+                records.append(({"op": "chunk", "layer": name, "key": list(key)}, QImage(chunk) if chunk is not None else None))
+            dirty.keys.clear()
+        records.extend(self.records)
+        self.records = []
+        if records:
+            self.pool.submit(self._write, records)
+
+    def checkpoint(self, layers, objects):
+        """Start a new file holding just the whole map as it is now, objects being the header of an "objects" record"""
+        records = []
+        for name, layer in layers.items():
+            self._follow(name, layer)
+            records.extend(self._layer_records(name, layer))
+        records.append((objects, None))
+        self.records = []
+        self.checkpointing = self.pool.submit(self._write_checkpoint, records)
+
+    def needs_checkpoint(self):
+        """True once the edits since the last checkpoint take more room than a fresh one would"""
+        if self.checkpointing is not None and not self.checkpointing.done():
+            return False
+        return self.size - self.checkpoint_size > max(JOURNAL_COMPACT_BYTES, self.checkpoint_size)
+
+    def _write(self, records):
+        if self.file is None:
+            return
+        try:
+            for header, image in records:
+                data = self._encode(header, image)
+                self.file.write(data)
+                self.size += len(data)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        except OSError as e:
+            self.error = e
+
+    def _write_checkpoint(self, records):
+        # the old file stays until the new one is complete, a crash halfway through still leaves one that replays
+        tmp_path = self.path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            size = 0
+            with open(tmp_path, "wb") as f:
+                for header, image in records:
+                    data = self._encode(header, image)
+                    f.write(data)
+                    size += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            if self.file is not None:
+                self.file.close()
+            os.replace(tmp_path, self.path)
+            self.file = open(self.path, "ab")
+            self.size = self.checkpoint_size = size
+        except OSError as e:
+            self.error = e
+
+    def close(self):
+        """Clean exit, nothing needs recovering so the file goes"""
+        self.pool.shutdown(wait=True)
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        for layer, dirty in self.layers.values():
+            if dirty in layer.watchers:
+                layer.watchers.remove(dirty)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+# downloaded assets live here between launches so we don't hammer github every startup
+class AssetCache:
+    """Content-addressed on-disk store for asset files, keyed by git blob sha"""
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, "blobs")
+        self.index_path = os.path.join(root, "index.json")
+        self.dirty = False
+        self.lock = threading.Lock()  # the fetch pool reads and writes from several threads
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.index = self._read_index()
+
+    @staticmethod
+    def blob_sha(data):
+        """Same hash git (and the contents API) uses for a file"""
+        return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            index.setdefault("blobs", {})
+            index.setdefault("manifests", {})
+            return index
+        except (OSError, ValueError):
+            return {"blobs": {}, "manifests": {}}
+
+    def _blob_path(self, sha):
+        return os.path.join(self.blob_dir, sha[:2], sha)
+
+    def contains(self, sha):
+        with self.lock:
+            return sha in self.index["blobs"]
+
+    def get(self, sha):
+        with self.lock:
+            if sha not in self.index["blobs"]:
+                return None
+        try:
+            with open(self._blob_path(sha), "rb") as f:
+                data = f.read()
+        except OSError:
+            with self.lock:
+                self.index["blobs"].pop(sha, None)
+                self.dirty = True
+            return None
+        with self.lock:
+            entry = self.index["blobs"].get(sha)
+            if entry is not None:
+                entry["used"] = time.time()
+                self.dirty = True
+        return data
+
+    def put(self, sha, data):
+        if self.blob_sha(data) != sha:
+            return False  # truncated or mangled download, don't keep it
+        path = self._blob_path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return False
+        with self.lock:
+            self.index["blobs"][sha] = {"size": len(data), "used": time.time()}
+            self.dirty = True
+            self._evict()
+        return True
+
+    def get_manifest(self, source_key):
+        with self.lock:
+            return self.index["manifests"].get(source_key)
+
+    def put_manifest(self, source_key, manifest):
+        with self.lock:
+            self.index["manifests"][source_key] = manifest
+            self.dirty = True
+
+    def total_bytes(self):
+        return sum(entry["size"] for entry in self.index["blobs"].values())
+
+    def _evict(self):
+        """Drop least recently used blobs until we're back under the size cap, caller holds the lock"""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        for sha, entry in sorted(self.index["blobs"].items(), key=lambda kv: kv[1]["used"]):
+            try:
+                os.remove(self._blob_path(sha))
+            except OSError:
+                pass
+            del self.index["blobs"][sha]
+            total -= entry["size"]
+            if total <= self.max_bytes:
+                break
+
+    def verify(self):
+        """Re-hash every blob on disk, drop corrupt ones and rebuild the index from what's left"""
+        blobs = {}
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.blob_dir):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except OSError:
+                    continue
+                if filename.endswith(".tmp") or self.blob_sha(data) != filename:
+                    os.remove(path)
+                    removed += 1
+                    continue
+                old = self.index["blobs"].get(filename, {})
+                blobs[filename] = {"size": len(data), "used": old.get("used", os.path.getmtime(path))}
+        with self.lock:
+            self.index["blobs"] = blobs
+            self.dirty = True
+            self._evict()
+        self.save()
+        return len(blobs), removed
+
+    def clear(self):
+        """Throw away everything so the next launch downloads fresh copies"""
+        shutil.rmtree(self.blob_dir, ignore_errors=True)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self.lock:
+            self.index = {"blobs": {}, "manifests": {}}
+            self.dirty = True
+        self.save()
+
+    def save(self):
+        with self.lock:
+            if not self.dirty:
+                return
+            tmp_path = self.index_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(self.index, f)
+                os.replace(tmp_path, self.index_path)
+                self.dirty = False
+            except OSError:
+                pass
+
+# every network request for assets goes through here
+class AssetFetcher:
+    """Bounded thread pool for asset requests, with a cap on how many hit the same host at once"""
+    def __init__(self, max_workers, per_host):
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asset-fetch")
+        self.http = HttpClient(ASSET_FETCH_TIMEOUT, ASSET_FETCH_RETRIES, ASSET_FETCH_BACKOFF)
+        self.per_host = per_host
+        self.host_slots = {}
+        self.futures = set()
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        future = self.pool.submit(fn, *args)
+        with self.lock:
+            self.futures.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+    def shutdown(self):
+        """Drop everything still queued so closing the editor doesn't wait on downloads"""
+        with self.lock:
+            futures = list(self.futures)
+        for future in futures:
+            future.cancel()
+        self.pool.shutdown(wait=False)
+
+    def _host_slot(self, url):
+        host = urllib.parse.urlsplit(url).netloc
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return self.host_slots[host]
+
+    def fetch(self, url):
+        status, body, _ = self.fetch_conditional(url)
+        return body
+
+    def fetch_conditional(self, url, etag=None):
+        """GET with If-None-Match, returns (status, body, etag) where a 304 has an empty body"""
+        with self._host_slot(url):
+            return self.http.get(url, etag)
+
+class HttpStatusError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+# urlopen does a fresh connect + TLS handshake per file, this keeps them open
+class HttpClient:
+    """Keep-alive HTTP(S) GETs with timeouts and bounded retries, one connection per host per thread"""
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+    def __init__(self, timeout, retries, backoff):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.local = threading.local()  # http.client connections can't be shared between threads
+
+    def _connection(self, scheme, netloc):
+        connections = self.local.__dict__.setdefault("connections", {})
+        connection = connections.get((scheme, netloc))
+        if connection is None:
+            connection_class = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connection = connections[(scheme, netloc)] = connection_class(netloc, timeout=self.timeout)
+        return connection
+
+    def _drop_connection(self, scheme, netloc):
+        connection = self.local.__dict__.get("connections", {}).pop((scheme, netloc), None)
+        if connection is not None:
+            connection.close()
+
+    def get(self, url, etag=None):
+        """Returns (status, body, etag), status is 200ish or 304. Raises once retries run out"""
+        headers = {"User-Agent": "Father-Map-Editor", "Connection": "keep-alive"}
+        if etag:
+            headers["If-None-Match"] = etag
+        redirects = 0
+        attempt = 0
+        while True:
+            parts = urllib.parse.urlsplit(url)
+            target = parts.path + (f"?{parts.query}" if parts.query else "")
+            connection = self._connection(parts.scheme, parts.netloc)
+            reused = connection.sock is not None
+            try:
+                connection.request("GET", target, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._drop_connection(parts.scheme, parts.netloc)
+                # the server closing an idle keep-alive connection isn't a real failure
+                if reused and isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+                    continue
+                error = e
+            else:
+                if response.will_close:
+                    self._drop_connection(parts.scheme, parts.netloc)
+                if response.status in self.REDIRECT_STATUSES and redirects < 5:
+                    url = urllib.parse.urljoin(url, response.getheader("Location", ""))
+                    redirects += 1
+                    continue
+                if response.status == 304 or 200 <= response.status < 300:
+                    return response.status, body, response.getheader("ETag", etag)
+                if response.status == 403 and response.getheader("X-RateLimit-Remaining") == "0":
+                    raise HttpStatusError(403, "GitHub API rate limit exceeded")
+                error = HttpStatusError(response.status, response.reason)
+                if response.status not in self.RETRY_STATUSES:
+                    raise error
+            if attempt >= self.retries:
+                raise error
+            time.sleep(self.backoff * (2 ** attempt) * (0.5 + random.random()))
+            attempt += 1
+
+# decoded images are the big memory hog, so only keep the ones that are actually in use
+class ImageCache(QObject):
+    """LRU of decoded asset pixmaps under a byte budget, pinned keys (placed on the map) are never evicted.
+    Decodes run on a pool of their own, image_ready fires on the GUI thread once a key is in"""
+    image_ready = pyqtSignal(str)
+    _decoded = pyqtSignal(str, object)
+
+    def __init__(self, max_bytes, max_workers):
+        super().__init__()
+        self.max_bytes = max_bytes
+        # not the fetch pool, a picked stamp shouldn't queue behind the whole startup prefetch
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-decode")
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.pinned = set()
+        self.total_bytes = 0
+        # what previews draw while the real image is still on its way
+        self.loading = QPixmap(32, 32)
+        self.loading.fill(QColor(128, 128, 128, 96))
+        self._decoded.connect(self._on_decoded)
+
+    @staticmethod
+    def pixmap_bytes(pixmap):
+        return pixmap.width() * pixmap.height() * max(1, pixmap.depth()) // 8
+
+    def get(self, key, read):
+        """The pixmap for key, or None after queueing read() (returns a QImage or None) on the pool"""
+        pixmap = self.entries.get(key)
+        if pixmap is not None:
+            self.entries.move_to_end(key)
+            return pixmap
+        if key not in self.pending:
+            self.pending[key] = self.pool.submit(self._read, key, read)
+        return None
+
+    def _read(self, key, read):
+        # runs on the fetch pool, always reports back so the key doesn't stay pending
+        image = None
+        try:
+            image = read()
+        finally:
+            self._decoded.emit(key, image)
+        return image
+
+    def _on_decoded(self, key, image):
+        self.pending.pop(key, None)
+        if image is None or image.isNull():
+            # same kind of stand-in import uses for missing assets
+            pixmap = QPixmap(32, 32)
+            pixmap.fill(Qt.transparent)
+        else:
+            pixmap = QPixmap.fromImage(image)
+        self.entries[key] = pixmap
+        self.total_bytes += self.pixmap_bytes(pixmap)
+        # whoever asked for it hasn't seen it yet, even if the pinned images alone are over budget
+        self._evict(keep=key)
+        self.image_ready.emit(key)
+
+    def set_pinned(self, keys):
+        self.pinned = set(keys)
+        self._evict()
+
+    def shutdown(self):
+        for future in list(self.pending.values()):
+            future.cancel()
+        self.pool.shutdown(wait=False)
+
+    def _evict(self, keep=None):
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key in self.pinned or key == keep:
+                continue
+            self.total_bytes -= self.pixmap_bytes(self.entries.pop(key))
+
+class AssetHandle:
+    """A library asset that decodes its image and collision mask on first use, reads like the old asset dicts"""
+    def __init__(self, name, category, path, sha, collision_path, collision_sha, source, image_cache):
+        self.name = name
+        self.category = category
+        self.path = path
+        self.sha = sha
+        self.collision_path = collision_path
+        self.collision_sha = collision_sha
+        self.source = source
+        self.image_cache = image_cache
+
+    @property
+    def key(self):
+        return f"{self.path}@{self.sha}"
+
+    def image(self):
+        """Decoded image, or the cache's loading placeholder until it's in"""
+        pixmap = self.image_cache.get(self.key, lambda: self.source.read_image(self.path, self.sha))
+        return pixmap if pixmap is not None else self.image_cache.loading
+
+    def collision(self):
+        """Decoded collision mask, None if there isn't one or it's still loading"""
+        if not self.collision_sha:
+            return None
+        return self.image_cache.get(self.collision_key(), lambda: self.source.read_image(self.collision_path, self.collision_sha))
+
+    def collision_key(self):
+        return f"{self.collision_path}@{self.collision_sha}" if self.collision_sha else None
+
+    def ready(self):
+        """True once the image and collision mask are both decoded, starts decoding whichever isn't"""
+        image = self.image_cache.get(self.key, lambda: self.source.read_image(self.path, self.sha))
+        if not self.collision_sha:
+            return image is not None
+        return self.collision() is not None and image is not None
+
+    def __getitem__(self, field):
+        if field == "name":
+            return self.name
+        if field == "image":
+            return self.image()
+        if field == "collision":
+            return self.collision()
+        raise KeyError(field)
+
+# the pickers used to rescale every full image on every open
+class ThumbnailStore(QObject):
+    """Picker icons for assets, made once on a worker thread and kept in memory and on disk by asset sha"""
+    thumbnail_ready = pyqtSignal(str)
+    _generated = pyqtSignal(str, QImage)
+
+    def __init__(self, root, size, max_workers):
+        super().__init__()
+        self.root = root
+        self.size = size
+        self.icons = {}
+        self.pending = {}
+        self.placeholder = QIcon()
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="thumbnails")
+        os.makedirs(root, exist_ok=True)
+        self._generated.connect(self._on_generated)
+
+    def icon(self, asset):
+        """The asset's icon if it's ready, otherwise a blank one and thumbnail_ready fires later"""
+        icon = self.icons.get(asset.key)
+        if icon is not None:
+            return icon
+        if asset.key not in self.pending:
+            self.pending[asset.key] = self.pool.submit(self._generate, asset)
+        return self.placeholder
+
+    def _thumb_path(self, asset):
+        # only github's sha is a content hash, local and zip ones are size+mtime/crc so they need the source and path too
+        name = hashlib.sha1(f"{asset.source.source_id}\n{asset.path}\n{asset.sha}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, f"{name}_{self.size}.png")
+
+    def _generate(self, asset):
+        thumb = QImage(self.size, self.size, QImage.Format_ARGB32)
+        thumb.fill(Qt.transparent)
+        try:
+            path = self._thumb_path(asset)
+            cached = QImage(path) if os.path.exists(path) else QImage()
+            if not cached.isNull():
+                thumb = cached
+                return
+            image = asset.source.read_image(asset.path, asset.sha)
+            if image is None:
+                return
+            thumb = image.scaled(self.size, self.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            # own temp file per write, two workers can be making the same thumbnail
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.root)
+            os.close(fd)
+            try:
+                if thumb.save(tmp_path, "PNG"):
+                    os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        finally:
+            # always report back, otherwise the key stays pending and never gets another try
+            self._generated.emit(asset.key, thumb)
+
+    def _on_generated(self, key, thumb):
+        self.pending.pop(key, None)
+        self.icons[key] = QIcon(QPixmap.fromImage(thumb))
+        self.thumbnail_ready.emit(key)
+
+    def shutdown(self):
+        for future in list(self.pending.values()):
+            future.cancel()
+        self.pool.shutdown(wait=False)
+
+# everything the loader needs from wherever the assets live
+class AssetSource:
+    """Base asset backend: a manifest of {path, type, sha} entries plus a way to read each file"""
+    label = "asset source"
+    remote = False  # remote sources get their files prefetched into the disk cache
+    source_id = ""  # which repo/folder/file this is, for caches shared between sources
+
+    def manifest(self):
+        raise NotImplementedError
+
+    def prefetch(self, path, sha):
+        pass
+
+    def read(self, path, sha):
+        raise NotImplementedError
+
+    def read_image(self, path, sha):
+        """Decode a file into a QImage, safe to call off the GUI thread (QPixmap isn't)"""
+        data = self.read(path, sha)
+        if data:
+            image = QImage()
+            if image.loadFromData(data):
+                return image
+        return None
+
+    @staticmethod
+    def _tree_entries(paths):
+        """Build manifest entries for a flat list of (path, sha) files, adding the folders they imply"""
+        entries = []
+        folders = set()
+        for path, sha in paths:
+            parts = path.split("/")
+            if parts[0] not in ASSET_LIBRARY_LABELS:
+                continue
+            for depth in range(1, len(parts)):
+                folder = "/".join(parts[:depth])
+                if folder not in folders:
+                    folders.add(folder)
+                    entries.append({"path": folder, "type": "tree", "sha": ""})
+            entries.append({"path": path, "type": "blob", "sha": sha})
+        return entries
+
+class GitHubAssetSource(AssetSource):
+    """The asset folders of the editor's GitHub repo, downloads go through the on-disk cache"""
+    label = "GitHub"
+    remote = True
+
+    def __init__(self, cache, fetcher, log, on_error):
+        self.cache = cache
+        self.fetcher = fetcher
+        self.log = log
+        self.on_error = on_error
+        self.manifest_key = f"{GITHUB_API_BASE}/{GITHUB_REPO}@{GITHUB_BRANCH}"
+        self.source_id = self.manifest_key
+
+    def manifest(self):
+        """Get the recursive file tree of the asset branch, a no-change startup costs a single 304"""
+        cached = self.cache.get_manifest(self.manifest_key)
+        try:
+            api_url = f"{GITHUB_API_BASE}/{GITHUB_REPO}/git/trees/{GITHUB_BRANCH}?recursive=1"
+            status, body, etag = self.fetcher.fetch_conditional(api_url, cached["etag"] if cached else None)
+            if status == 304:
+                return cached["tree"]
+            data = json.loads(body.decode('utf-8'))
+            if data.get("truncated"):
+                self.log("Warning: GitHub truncated the asset manifest, some assets may be missing")
+            # only keep what the loader needs, the full tree can be big
+            tree = [
+                {"path": entry['path'], "type": entry['type'], "sha": entry['sha']}
+                for entry in data.get("tree", [])
+                if entry['path'].split("/")[0] in ASSET_LIBRARY_LABELS
+            ]
+            self.cache.put_manifest(self.manifest_key, {"sha": data.get("sha"), "etag": etag, "tree": tree})
+            return tree
+        except Exception as e:
+            self.on_error("asset manifest download", e)
+            if cached is not None:
+                self.log("Offline, using cached asset manifest")
+                return cached["tree"]
+            return None
+
+    def prefetch(self, path, sha):
+        if not self.cache.contains(sha):
+            self.read(path, sha)
+
+    def read(self, path, sha):
+        """Download a file from GitHub repository, going through the asset cache when the sha is known"""
+        return self._download(f"{GITHUB_RAW_BASE}/{GITHUB_REPO}/{GITHUB_BRANCH}/{path}", path, sha)
+
+    def _download(self, url, path, sha):
+        if sha:
+            data = self.cache.get(sha)
+            if data is not None:
+                return data
+        try:
+            data = self.fetcher.fetch(url)
+        except Exception as e:
+            self.on_error(f"download of {path}", e)
+            return None
+        if sha:
+            self.cache.put(sha, data)
+        return data
+
+class HttpMirrorAssetSource(GitHubAssetSource):
+    """Any static HTTP server holding the asset folders plus a manifest.json (see --write-manifest)"""
+    label = "asset mirror"
+
+    def __init__(self, base_url, cache, fetcher, log, on_error):
+        super().__init__(cache, fetcher, log, on_error)
+        self.base_url = base_url.rstrip("/")
+        self.manifest_key = self.source_id = self.base_url
+
+    def manifest(self):
+        cached = self.cache.get_manifest(self.manifest_key)
+        try:
+            status, body, etag = self.fetcher.fetch_conditional(f"{self.base_url}/manifest.json", cached["etag"] if cached else None)
+            if status == 304:
+                return cached["tree"]
+            tree = json.loads(body.decode('utf-8'))["tree"]
+            self.cache.put_manifest(self.manifest_key, {"etag": etag, "tree": tree})
+            return tree
+        except Exception as e:
+            self.on_error(f"asset manifest download from {self.base_url}", e)
+            if cached is not None:
+                self.log("Offline, using cached asset manifest")
+                return cached["tree"]
+            return None
+
+    def read(self, path, sha):
+        return self._download(f"{self.base_url}/{urllib.parse.quote(path)}", path, sha)
+
+class LocalAssetSource(AssetSource):
+    """Asset folders on disk, e.g. a checkout of this repo"""
+    label = "local folder"
+
+    def __init__(self, root):
+        self.root = root
+        self.source_id = os.path.abspath(root)
+
+    def manifest(self):
+        files = []
+        for library in ASSET_LIBRARY_LABELS:
+            for dirpath, dirnames, filenames in os.walk(os.path.join(self.root, library)):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    full_path = os.path.join(dirpath, filename)
+                    stat = os.stat(full_path)
+                    # files on disk have no blob sha, size + mtime is enough to tell versions apart
+                    path = os.path.relpath(full_path, self.root).replace(os.sep, "/")
+                    files.append((path, f"{stat.st_size:x}-{stat.st_mtime_ns:x}"))
+        return self._tree_entries(files)
+
+    def read(self, path, sha):
+        try:
+            with open(os.path.join(self.root, *path.split("/")), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+class ZipAssetSource(AssetSource):
+    """A single zip holding the asset folders, read in place without unpacking"""
+    label = "asset bundle"
+
+    def __init__(self, path):
+        self.zip_file = zipfile.ZipFile(path, "r")
+        self.source_id = os.path.abspath(path)
+        # github's "download zip" wraps everything in one top folder, look through it
+        self.prefix = ""
+        names = [name for name in self.zip_file.namelist() if name.strip("/")]
+        if names and not any(name.split("/")[0] in ASSET_LIBRARY_LABELS for name in names):
+            top = names[0].split("/")[0]
+            if all(name.startswith(top + "/") for name in names):
+                self.prefix = top + "/"
+
+    def manifest(self):
+        files = [
+            (info.filename[len(self.prefix):], f"{info.CRC:08x}-{info.file_size:x}")
+            for info in self.zip_file.infolist()
+            if not info.is_dir() and info.filename.startswith(self.prefix)
+        ]
+        return self._tree_entries(files)
+
+    def read(self, path, sha):
+        try:
+            return self.zip_file.read(self.prefix + path)
+        except KeyError:
+            return None
+
+def make_asset_source(spec, cache, fetcher, log, on_error):
+    """Pick a backend from a spec: "github", an http(s) mirror url, a .zip bundle, an .fpack or a folder"""
+    if spec == "github":
+        return GitHubAssetSource(cache, fetcher, log, on_error)
+    if spec.startswith(("http://", "https://")):
+        return HttpMirrorAssetSource(spec, cache, fetcher, log, on_error)
+    if spec.lower().endswith(".zip"):
+        try:
+            return ZipAssetSource(spec)
+        except (OSError, zipfile.BadZipFile) as e:
+            log(f"Couldn't open asset bundle {spec}: {str(e)}, using GitHub instead")
+            return GitHubAssetSource(cache, fetcher, log, on_error)
+    if spec.lower().endswith(".fpack"):
+        # opened on the loader thread, which falls back to GitHub if it won't
+        return PackAssetSource(spec)
+    return LocalAssetSource(spec)
+
+def write_asset_manifest(root):
+    """Write manifest.json for a folder of assets so it can be served as an HTTP mirror"""
+    files = []
+    for entry in LocalAssetSource(root).manifest():
+        if entry["type"] == "blob":
+            with open(os.path.join(root, *entry["path"].split("/")), "rb") as f:
+                files.append((entry["path"], AssetCache.blob_sha(f.read())))
+    tree = AssetSource._tree_entries(files)
+    with open(os.path.join(root, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"tree": tree}, f, indent=1)
+    return len(files)
+
+class PackAssetSource(AssetSource):
+    """An .fpack bundle from --build-pack: one read, a few atlas decodes, then every asset is a slice"""
+    label = "asset pack"
+
+    def __init__(self, path):
+        self.path = path
+        self.source_id = os.path.abspath(path)
+        self.load_lock = threading.Lock()
+        self.atlas_lock = threading.Lock()
+        self.slices = None  # path -> (sha, atlas, rect) once load() has read the pack
+
+    def load(self):
+        """Read and index the whole pack the first time it's needed, normally by manifest() on the loader thread"""
+        with self.load_lock:
+            if self.slices is None:
+                with open(self.path, "rb") as f:
+                    index, self.atlas_data = read_asset_pack(f.read())
+                self.atlases = [None] * len(self.atlas_data)
+                self.slices = {path: (sha, atlas, rect) for path, sha, atlas, rect in asset_pack_files(index)}
+            return self.slices
+
+    def manifest(self):
+        return self._tree_entries((path, sha) for path, (sha, _, _) in self.load().items())
+
+    def read(self, path, sha):
+        """A file's bytes, the pack only keeps atlases so its slice gets encoded back into a PNG"""
+        image = self.read_image(path, sha)
+        if image is None:
+            return None
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, "PNG")
+        return bytes(buffer.data())
+
+    def _atlas(self, i):
+        with self.atlas_lock:
+            if self.atlases[i] is None:
+                self.atlases[i] = QImage.fromData(self.atlas_data[i], "PNG")
+            return self.atlases[i]
+
+    def read_image(self, path, sha):
+        slices = self.load()
+        if path not in slices:
+            return None
+        _, atlas, rect = slices[path]
+        return self._atlas(atlas).copy(QRect(*rect))
+
+ASSET_PACK_MAGIC = b"FPACK1\n"
+
+def read_asset_pack(data):
+    """Split an .fpack file into its index and the encoded atlas images, ValueError if they don't add up"""
+    if not data.startswith(ASSET_PACK_MAGIC):
+        raise ValueError("not an asset pack")
+    pos = len(ASSET_PACK_MAGIC)
+    if len(data) < pos + 4:
+        raise ValueError("asset pack is cut short")
+    (index_size,) = struct.unpack_from("<I", data, pos)
+    pos += 4
+    if pos + index_size > len(data):
+        raise ValueError("asset pack index is cut short")
+    index = json.loads(data[pos:pos + index_size].decode("utf-8"))
+    pos += index_size
+    _check_asset_pack_index(index, len(data) - pos)
+    atlas_data = [data[pos + atlas["offset"]:pos + atlas["offset"] + atlas["size"]] for atlas in index["atlases"]]
+    return index, atlas_data
+
+def _check_asset_pack_index(index, blob_bytes):
+    """Raise ValueError unless every atlas lies inside the file and every slice inside its atlas"""
+    is_count = lambda value: isinstance(value, int) and not isinstance(value, bool) and value >= 0
+    try:
+        atlases = index["atlases"]
+        for atlas in atlases:
+            if not all(is_count(atlas[field]) for field in ("offset", "size", "width", "height")):
+                raise ValueError("asset pack atlas has a bad offset or size")
+            if atlas["offset"] + atlas["size"] > blob_bytes:
+                raise ValueError("asset pack atlas runs past the end of the file")
+        for asset in index["assets"]:
+            if not all(isinstance(asset[field], str) for field in ("library", "name", "sha")) or not isinstance(asset["category"], (str, type(None))):
+                raise ValueError("asset pack entry has a bad name")
+            for part in [asset] + ([asset["collision"]] if asset["collision"] else []):
+                atlas, rect = part["atlas"], part["rect"]
+                if not isinstance(part["sha"], str) or not is_count(atlas) or atlas >= len(atlases) or len(rect) != 4 or not all(is_count(v) for v in rect):
+                    raise ValueError("asset pack slice has a bad atlas or rect")
+                if rect[0] + rect[2] > atlases[atlas]["width"] or rect[1] + rect[3] > atlases[atlas]["height"]:
+                    raise ValueError("asset pack slice runs off its atlas")
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"asset pack index is malformed ({e!r})")
+
+def asset_pack_files(index):
+    """Yield (path, sha, atlas, rect) for every image and collision mask in a pack index"""
+    for asset in index["assets"]:
+        folder = asset["library"] if asset["category"] is None else f"{asset['library']}/{asset['category']}"
+        yield f"{folder}/{asset['name']}.png", asset["sha"], asset["atlas"], asset["rect"]
+        if asset["collision"]:
+            collision = asset["collision"]
+            yield f"{folder}/{asset['name']}_collision.png", collision["sha"], collision["atlas"], collision["rect"]
+
+def _pack_atlases(images, max_size):
+    """Shelf-pack {key: QImage} into as few atlases as fit in max_size, returns [(atlas, {key: rect})]"""
+    atlases = []
+    placements, x, y, shelf_height, width = {}, 0, 0, 0, 0
+    for key, image in sorted(images.items(), key=lambda kv: -kv[1].height()):
+        w, h = image.width(), image.height()
+        if x + w > max_size and x > 0:
+            x, y, shelf_height = 0, y + shelf_height, 0
+        if y + h > max_size and placements:
+            atlases.append((placements, width, y + shelf_height))
+            placements, x, y, shelf_height, width = {}, 0, 0, 0, 0
+        placements[key] = (x, y, w, h)
+        x += w
+        width = max(width, x)
+        shelf_height = max(shelf_height, h)
+    if placements:
+        atlases.append((placements, width, y + shelf_height))
+
+    result = []
+    for placements, width, height in atlases:
+        atlas = QImage(max(1, width), max(1, height), QImage.Format_ARGB32)
+        atlas.fill(Qt.transparent)
+        painter = QPainter(atlas)
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        for key, (px, py, _, _) in placements.items():
+            painter.drawImage(px, py, images[key])
+        painter.end()
+        result.append((atlas, placements))
+    return result
+
+def build_asset_pack(root, out_path):
+    """Pack the asset folders under root into one .fpack, only decoding PNGs that changed since the last build"""
+    old_slices = {}
+    old_atlases = []
+    if os.path.exists(out_path):
+        try:
+            old_source = PackAssetSource(out_path)
+            old_slices = old_source.load()
+            old_atlases = old_source
+        except (OSError, ValueError, KeyError):
+            old_slices = {}
+
+    source = LocalAssetSource(root)
+    files = {entry["path"]: entry["sha"] for entry in source.manifest() if entry["type"] == "blob" and entry["path"].lower().endswith(".png")}
+    images = {}
+    reused = decoded = 0
+    for path, sha in files.items():
+        old = old_slices.get(path)
+        if old is not None and old[0] == sha:
+            image = old_atlases.read_image(path, sha)
+            reused += 1
+        else:
+            image = source.read_image(path, sha)
+            decoded += 1
+        if image is not None and not image.isNull():
+            images[path] = image
+
+    # main images and collision masks get their own atlases so loading one never decodes the other
+    is_collision = lambda path: path.lower().endswith("_collision.png")
+    packed = _pack_atlases({p: i for p, i in images.items() if not is_collision(p)}, ASSET_PACK_ATLAS_SIZE)
+    packed += _pack_atlases({p: i for p, i in images.items() if is_collision(p)}, ASSET_PACK_ATLAS_SIZE)
+
+    atlases = []
+    blobs = []
+    offset = 0
+    where = {}
+    for atlas_index, (atlas, placements) in enumerate(packed):
+        buffer = QBuffer()
+        buffer.open(QIODevice.WriteOnly)
+        atlas.save(buffer, "PNG")
+        blob = bytes(buffer.data())
+        atlases.append({"offset": offset, "size": len(blob), "width": atlas.width(), "height": atlas.height()})
+        blobs.append(blob)
+        offset += len(blob)
+        for path, rect in placements.items():
+            where[path] = (atlas_index, list(rect))
+
+    assets = []
+    for path in sorted(where):
+        if is_collision(path):
+            continue
+        parts = path.split("/")
+        if len(parts) == 3:
+            library, category, filename = parts
+        elif len(parts) == 2 and parts[0] == "tiles":
+            library, category, filename = parts[0], None, parts[1]
+        else:
+            continue
+        collision_path = path[:-4] + "_collision.png"
+        collision = None
+        if collision_path in where:
+            collision = {"sha": files[collision_path], "atlas": where[collision_path][0], "rect": where[collision_path][1]}
+        assets.append({
+            "library": library,
+            "category": category,
+            "name": filename[:-4],
+            "sha": files[path],
+            "atlas": where[path][0],
+            "rect": where[path][1],
+            "collision": collision
+        })
+
+    index = json.dumps({"atlases": atlases, "assets": assets}).encode("utf-8")
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(ASSET_PACK_MAGIC)
+        f.write(struct.pack("<I", len(index)))
+        f.write(index)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp_path, out_path)
+    return len(assets), reused, decoded
+
 GITHUB_REPO = "The-Sons/Father-Map-Editor"
-GITHUB_API_BASE = "https://api.github.com/repos"
-GITHUB_RAW_BASE = "https://raw.githubusercontent.com"
+# overridable so the loader can be pointed at a local stand-in server
+GITHUB_API_BASE = os.environ.get("FATHER_GITHUB_API_BASE", "https://api.github.com/repos")
+GITHUB_RAW_BASE = os.environ.get("FATHER_GITHUB_RAW_BASE", "https://raw.githubusercontent.com")
 GITHUB_BRANCH = "main"
+# "github", an http(s) mirror url, a path to a .zip bundle, an .fpack from --build-pack or a folder with stamps/prefabs/npcs/tiles in it
+ASSET_SOURCE = os.environ.get("FATHER_ASSET_SOURCE", "github")
+ASSET_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "father-map-editor")
+ASSET_CACHE_MAX_BYTES = 512 * 1024 * 1024
+ASSET_FETCH_WORKERS = 16
+ASSET_FETCH_PER_HOST = 8
+ASSET_FETCH_TIMEOUT = 30
+ASSET_FETCH_RETRIES = 3
+ASSET_FETCH_BACKOFF = 0.5
+ASSET_PACK_ATLAS_SIZE = 2048
+ASSET_IMAGE_CACHE_BYTES = 256 * 1024 * 1024
+IMAGE_DECODE_WORKERS = 2  # decodes of assets the user picked or placed, downloads still wait for a per-host slot
+THUMBNAIL_SIZE = 32
+THUMBNAIL_WORKERS = 2
+MAP_CHUNK_SIZE = 256  # map pixels per side of a map layer chunk, a multiple of SPAWN_CHUNK_SIZE
+OBJECT_INDEX_CELL_SIZE = 256  # map pixels per spatial index cell
+LABEL_MIN_ZOOM = 0.5  # below this trigger/spawn labels aren't drawn, a spawn box is only 16px there
+SPAWN_CHUNK_SIZE = 32  # map pixels per side of one of the game's chunks (spawns export as chunk_x = x // this), also the grid and tile snap
+GRID_MIN_SPACING = 4  # screen pixels between grid lines below which only every other (4th, 8th...) chunk line is drawn
+GRID_PATTERN_ROWS = 64  # height of the strip the vertical grid lines are tiled from
+GRID_CHUNK_COLOR = QColor(255, 0, 0, 115)
+GRID_FAR_COLOR = QColor(255, 0, 0, 50)  # the thinned out lines when zoomed too far out to show every chunk
+UNDO_MEMORY_BYTES = int(os.environ.get("FATHER_UNDO_MEMORY_MB", "256")) * 1024 * 1024  # per undo/redo stack, packed entries spill to disk past this
+UNDO_DISK_BYTES = int(os.environ.get("FATHER_UNDO_DISK_MB", "2048")) * 1024 * 1024  # per stack, the oldest entries are forgotten past this
+UNDO_HOT_ENTRIES = 8  # newest undo/redo steps that are never packed, so undoing them is instant
+UNDO_COMPRESS_LEVEL = 1  # zlib level, map pixels compress well even at the fastest setting
+UNDO_SPILL_COMPACT_BYTES = 64 * 1024 * 1024  # dead space the spill file is allowed before it's rewritten
+JOURNAL_DIR = os.environ.get("FATHER_JOURNAL_DIR", os.path.join(os.path.expanduser("~"), ".local", "state", "father-map-editor"))
+JOURNAL_FLUSH_MS = 1000  # how often edits get handed to the journal thread, at most this much work is lost in a crash
+JOURNAL_COMPACT_BYTES = 64 * 1024 * 1024  # edits the journal collects past its checkpoint before a fresh checkpoint replaces them
+JOURNAL_COMPRESS_LEVEL = 1
+COMPOSITE_CACHE_CHUNKS = 256  # blended collision mode chunks kept around, 64MB at the default chunk size
+ASSET_BROWSER_TITLES = {"stamps": "Stamp Categories", "prefabs": "Prefab Categories", "npcs": "NPC Categories", "tiles": "Tile Categories"}
+ASSET_LIBRARY_LABELS = {"stamps": "stamps", "prefabs": "prefabs", "npcs": "NPCs", "tiles": "tiles"}
 
 if __name__ == "__main__":
     import sys
+    if "--verify-cache" in sys.argv or "--rebuild-cache" in sys.argv:
+        cache = AssetCache(ASSET_CACHE_DIR, ASSET_CACHE_MAX_BYTES)
+        if "--rebuild-cache" in sys.argv:
+            cache.clear()
+            print(f"Cleared asset cache at {ASSET_CACHE_DIR}")
+        else:
+            kept, removed = cache.verify()
+            print(f"Asset cache verified: {kept} blobs kept, {removed} corrupt blobs removed")
+        sys.exit(0)
+    if "--write-manifest" in sys.argv:
+        root = sys.argv[sys.argv.index("--write-manifest") + 1]
+        print(f"Wrote manifest.json for {write_asset_manifest(root)} files in {root}")
+        sys.exit(0)
+    if "--build-pack" in sys.argv:
+        root, out_path = sys.argv[sys.argv.index("--build-pack") + 1:sys.argv.index("--build-pack") + 3]
+        count, reused, decoded = build_asset_pack(root, out_path)
+        print(f"Packed {count} assets into {out_path} ({reused} reused, {decoded} decoded)")
+        sys.exit(0)
+    asset_source_spec = None
+    if "--assets" in sys.argv:
+        asset_source_spec = sys.argv[sys.argv.index("--assets") + 1]
     app = QApplication(sys.argv)
-    window = EditorWindow()
+    window = EditorWindow(asset_source_spec)
     window.show()
     sys.exit(app.exec_())